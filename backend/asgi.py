@@ -14,6 +14,9 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Every request runs its sync code on a fresh thread, so persistent
+# connections would never be reused (see DATABASES in settings.py).
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 django_asgi_app = get_asgi_application()
 
@@ -18,7 +18,8 @@ from django.contrib import admin
 from django.urls import include, path
 
 urlpatterns = [
+    # Before admin.site.urls, whose catch-all would 404 /admin/dashboard/.
+    path("", include("core.public_urls")),
     path("admin/", admin.site.urls),
     path("api/", include("core.api_urls")),
-    path("", include("core.public_urls")),
 ]
@@ -0,0 +1,19 @@
+"""Gunicorn worker serving ``backend.asgi:application`` (HTTP and WebSockets).
+
+Used by ``gunicorn.conf.py``. On top of uvicorn's worker it turns off the
+lifespan protocol, which ``ProtocolTypeRouter`` does not handle, and bounds
+uvicorn's own shutdown by gunicorn's ``graceful_timeout``: on SIGTERM a
+worker stops accepting, closes its WebSockets with 1012 (service restart)
+so KDS screens reconnect and resume elsewhere, and lets in-flight HTTP
+requests finish before the arbiter would kill it.
+"""
+
+from uvicorn_worker import UvicornWorker
+
+
+class ASGIWorker(UvicornWorker):
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "lifespan": "off"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 1, 1)
@@ -0,0 +1,231 @@
+"""Latency, throughput and query counts along the order flow.
+
+    python -m benchmarks.bench_order_flow [--only orders,pages,dashboard,fanout]
+        [--repeat 200] [--dashboard-sizes 1000,10000,50000] [--screens 1,10,100]
+        [--json results.json]
+
+Everything runs in-process against the real URLconf, middleware and
+consumers, with no network: HTTP through Django's test client, WebSockets
+through channels' ``WebsocketCommunicator`` over the in-memory channel layer.
+
+* ``orders``: ``POST /api/orders/``, including the commit hooks (rollups,
+  live counters, event publishing);
+* ``pages``: ``menu_page`` and ``order_page`` render latency;
+* ``dashboard``: ``admin_dashboard`` latency after growing the order history
+  to each ``--dashboard-sizes`` total with ``manage.py generate_data``;
+* ``fanout``: time from one ``group_send`` until every one of N connected
+  ``OrderStreamConsumer`` screens has received the event.
+
+Requests are issued one at a time, so throughput is the inverse of the mean
+latency of a single client.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from io import StringIO
+
+from .utils import measure, setup_django, summarize, write_results
+
+SCENARIOS = ["orders", "pages", "dashboard", "fanout"]
+
+
+def int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def count_queries(func):
+    # Not CaptureQueriesContext: each test client request resets queries_log.
+    from django.db import connection
+
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        func()
+    return len(queries)
+
+
+def timed(func, repeat):
+    """Summarize ``func``'s latency and count the queries of one call."""
+    queries = count_queries(func)
+    durations = measure(func, repeat=repeat)
+    result = summarize(durations)
+    result["queries"] = queries
+    result["throughput_per_s"] = 1000 * len(durations) / sum(durations)
+    return result
+
+
+def report(name, result):
+    queries = result.get("queries")
+    print(
+        f"  {name:<26} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}"
+        f"  p99 {result['p99_ms']:8.2f} ms  {result['throughput_per_s']:9.1f}/s"
+        + (f"  queries {queries}" if queries is not None else "")
+    )
+
+
+def bench_orders(client, table, menu, args):
+    items = [{"menu_item_id": item.pk, "quantity": 1} for item in menu[: args.lines]]
+    payload = {"table_id": table.pk, "items": items}
+
+    def create():
+        response = client.post("/api/orders/", payload, format="json")
+        assert response.status_code == 201, response.content
+
+    print(f"POST /api/orders/ ({len(items)} lines)")
+    result = timed(create, args.repeat)
+    report("create order", result)
+    return {"create_order": result}
+
+
+def bench_pages(client, table, args):
+    print("Public pages")
+    results = {}
+    for name, url in (("menu_page", "/menu/"), ("order_page", f"/order/?table={table.pk}")):
+        def get(url=url):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        results[name] = timed(get, args.repeat)
+        report(name, results[name])
+    return results
+
+
+def bench_dashboard(client, args):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from core.models import Order
+
+    staff = get_user_model().objects.create_user("bench", password="bench", is_staff=True)
+    client.force_login(staff)
+
+    def get():
+        response = client.get("/admin/dashboard/")
+        assert response.status_code == 200, response.status_code
+
+    print("admin_dashboard")
+    results = {}
+    for size in sorted(args.dashboard_sizes):
+        missing = size - Order.objects.count()
+        if missing > 0:
+            call_command(
+                "generate_data",
+                tables=0,
+                menu_items=0,
+                orders=missing,
+                seed=size,
+                stdout=StringIO(),
+            )
+        results[str(size)] = timed(get, args.repeat)
+        report(f"{size} orders", results[str(size)])
+    return results
+
+
+async def fan_out(screen_counts, repeat, warmup=5):
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+
+    from core import events
+    from core.ws_consumers import OrderStreamConsumer
+
+    layer = get_channel_layer()
+    payload = {
+        "changes": [events.STATUS],
+        "order": {"id": 1, "table_id": 1, "status": "preparing"},
+        "previous_status": "received",
+    }
+    results = {}
+    for screens in screen_counts:
+        communicators = [
+            WebsocketCommunicator(OrderStreamConsumer.as_asgi(), "/ws/orders/")
+            for _ in range(screens)
+        ]
+        for communicator in communicators:
+            await communicator.connect()
+            await communicator.receive_json_from()
+        durations = []
+        for round_number in range(warmup + repeat):
+            message = {
+                "type": events.MESSAGE_TYPE,
+                "data": {**payload, "event_id": uuid.uuid4().hex},
+            }
+            start = time.perf_counter()
+            await layer.group_send(events.ORDERS_GROUP, message)
+            await asyncio.gather(
+                *(communicator.receive_json_from(timeout=5) for communicator in communicators)
+            )
+            if round_number >= warmup:
+                durations.append((time.perf_counter() - start) * 1000)
+        for communicator in communicators:
+            await communicator.disconnect()
+        result = summarize(durations)
+        result["throughput_per_s"] = 1000 * len(durations) / sum(durations)
+        result["frames_per_s"] = result["throughput_per_s"] * screens
+        results[str(screens)] = result
+    return results
+
+
+def bench_fanout(args):
+    print("WebSocket fan-out (in-memory channel layer)")
+    results = asyncio.run(fan_out(sorted(args.screens), args.repeat))
+    for screens, result in results.items():
+        report(f"{screens} screens", result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="Comma-separated scenarios.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=3, help="Lines per created order.")
+    parser.add_argument("--dashboard-sizes", type=int_list, default=[1000, 10000, 50000])
+    parser.add_argument("--screens", type=int_list, default=[1, 10, 100])
+    parser.add_argument("--json", metavar="PATH", help="Also write the results here.")
+    args = parser.parse_args()
+    scenarios = [name for name in args.only.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    setup_django()
+
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    from core.models import MenuItem, Table
+
+    override_settings(
+        CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+        ORDER_EVENTS={"ASYNC": False},
+        ORDER_STREAM={"REPLAY_BUFFER": 1000, "COALESCE_WINDOW": 0},
+    ).enable()
+
+    menu = list(MenuItem.objects.order_by("pk"))
+    tables = Table.objects.bulk_create(
+        Table(table_number=9000 + i, capacity=4) for i in range(20)
+    )
+    client = APIClient()
+
+    results = {}
+    if "orders" in scenarios:
+        results["orders"] = bench_orders(client, tables[0], menu, args)
+    if "pages" in scenarios:
+        results["pages"] = bench_pages(client, tables[1], args)
+    if "dashboard" in scenarios:
+        results["dashboard"] = bench_dashboard(client, args)
+    if "fanout" in scenarios:
+        results["fanout"] = bench_fanout(args)
+
+    if args.json:
+        write_results(args.json, "order_flow", args, results)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Nested OrderSerializer vs the compact values() representation.
+
+    python -m benchmarks.bench_order_listing [--orders 200] [--lines 5]
+"""
+
+import argparse
+
+from .utils import measure, seed_orders, setup_django, summarize, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results here.")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from core import compact
+    from core.models import Order
+    from core.serializers import ORDER_ITEMS_PREFETCH, OrderSerializer
+
+    seed_orders(args.orders, args.lines)
+
+    def nested():
+        queryset = Order.objects.select_related("table").prefetch_related(ORDER_ITEMS_PREFETCH)
+        return OrderSerializer(queryset.order_by("-created_at"), many=True).data
+
+    def flat():
+        return compact.compact_orders(compact.order_rows().order_by("-created_at"))
+
+    print(f"{args.orders} orders x {args.lines} lines")
+    results = {}
+    for name, func in (("nested", nested), ("compact", flat)):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        results[name] = summarize(measure(func, repeat=args.repeat))
+        results[name]["queries"] = len(queries)
+        print(
+            f"  {name:<8} p50 {results[name]['p50_ms']:8.2f} ms"
+            f"  mean {results[name]['mean_ms']:8.2f} ms  queries {len(queries)}"
+        )
+    print(f"  speedup  {results['nested']['p50_ms'] / results['compact']['p50_ms']:.1f}x")
+    if args.json:
+        write_results(args.json, "order_listing", args, results)
+
+
+if __name__ == "__main__":
+    main()
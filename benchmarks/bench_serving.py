@@ -0,0 +1,244 @@
+"""HTTP throughput under gunicorn: WSGI ``gthread`` vs the ASGI worker.
+
+    python -m benchmarks.bench_serving [--workers N] [--clients 8]
+        [--requests 300] [--sockets 50] [--redis] [--json results.json]
+
+Starts real servers with ``gunicorn.conf.py`` on a fresh SQLite file (in
+concurrency mode, seeded with ``generate_data``) and drives them over
+loopback from ``--clients`` processes, each sending ``--requests`` keep-alive
+GETs across the polled reads: order detail, table list and detail, and the
+order tracking page. Three runs: WSGI and ASGI on the sync views
+(``/api/sync/...``, ``.../sync/``), then ASGI on the async fast paths
+(``core.async_views``).
+
+For the ASGI run, ``--sockets`` KDS WebSockets (``/ws/orders/``) are opened
+before the load and asked for a snapshot after it; the ones that answer are
+reported as ``sockets_alive``. Without ``--redis`` the servers use an
+in-memory channel layer (see ``serving_settings``).
+
+The load generator shares the machine with the server, so compare the two
+modes with each other rather than with production numbers.
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .utils import summarize, write_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    "wsgi": ["-k", "gthread", "backend.wsgi:application"],
+    "asgi": ["backend.asgi:application"],
+}
+# generate_data's first table and order on the fresh database.
+ROUTES = {
+    "sync": [
+        "/api/sync/orders/1/",
+        "/api/sync/tables/",
+        "/api/sync/tables/1/",
+        "/order/track/1/sync/",
+    ],
+    "async": ["/api/orders/1/", "/api/tables/", "/api/tables/1/", "/order/track/1/"],
+}
+RUNS = {
+    "wsgi": ("wsgi", "sync"),
+    "asgi": ("asgi", "sync"),
+    "asgi_async_views": ("asgi", "async"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/api/tables/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def client(port, paths, requests, barrier, results):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    durations, errors = [], 0
+    barrier.wait()
+    started = time.perf_counter()
+    for index in range(requests):
+        start = time.perf_counter()
+        try:
+            connection.request("GET", paths[index % len(paths)])
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+        durations.append((time.perf_counter() - start) * 1000)
+    results.put((durations, errors, time.perf_counter() - started))
+
+
+def open_sockets(stack, port, count):
+    from websockets.sync.client import connect
+
+    sockets = []
+    for _ in range(count):
+        websocket = stack.enter_context(
+            connect(f"ws://127.0.0.1:{port}/ws/orders/", open_timeout=10)
+        )
+        json.loads(websocket.recv(timeout=10))  # hello
+        sockets.append(websocket)
+    return sockets
+
+
+def alive(websocket):
+    try:
+        websocket.send(json.dumps({"type": "snapshot"}))
+        while json.loads(websocket.recv(timeout=10))["type"] != "snapshot":
+            pass
+        return True
+    except Exception:
+        return False
+
+
+def run(mode, paths, env, args):
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "-c",
+        str(ROOT / "gunicorn.conf.py"),
+        "--bind",
+        f"127.0.0.1:{port}",
+    ]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    server = subprocess.Popen(
+        command + MODES[mode],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with contextlib.ExitStack() as stack:
+            wait_until_ready(port, server)
+            sockets = open_sockets(stack, port, args.sockets) if mode == "asgi" else []
+            return drive(port, paths, sockets, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def drive(port, paths, sockets, args):
+    """Run the client processes against ``port``, then check ``sockets``."""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.clients)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=client, args=(port, paths, args.requests, barrier, results)
+        )
+        for _ in range(args.clients)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    durations = [
+        duration for worker_durations, _e, _t in outcomes for duration in worker_durations
+    ]
+    result = summarize(durations)
+    result["errors"] = sum(errors for _d, errors, _t in outcomes)
+    result["requests_per_s"] = len(durations) / max(
+        elapsed for _d, _e, elapsed in outcomes
+    )
+    if sockets:
+        result["sockets"] = len(sockets)
+        result["sockets_alive"] = sum(alive(websocket) for websocket in sockets)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers", type=int, help="gunicorn workers (default: gunicorn.conf.py)."
+    )
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per client.")
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="Use the Redis channel layer.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results here.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "benchmarks.serving_settings",
+            "DJANGO_DEBUG": "False",
+            "DATABASE_URL": f"sqlite:///{Path(directory) / 'serving.sqlite3'}",
+            "SQLITE_CONCURRENCY_MODE": "True",
+            "GUNICORN_ACCESS_LOG": "",
+        }
+        if args.redis:
+            env["BENCH_REDIS"] = "1"
+        for command in (["migrate", "-v0"], ["generate_data", "--orders=500"]):
+            subprocess.run(
+                [sys.executable, "manage.py", *command],
+                cwd=ROOT,
+                env=env,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+
+        print(f"{args.clients} clients x {args.requests} GETs")
+        for name, (mode, routes) in RUNS.items():
+            result = run(mode, ROUTES[routes], env, args)
+            results[name] = result
+            print(
+                f"  {name:<16} {result['requests_per_s']:8.1f} req/s"
+                f"  p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}"
+                f"  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}"
+                + (
+                    f"  sockets alive {result['sockets_alive']}/{result['sockets']}"
+                    if "sockets" in result
+                    else ""
+                )
+            )
+
+    if args.json:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        import django
+
+        django.setup()
+        write_results(args.json, "serving", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Concurrent order placement on one SQLite file, default vs concurrency mode.
+
+    python -m benchmarks.bench_sqlite_concurrency [--workers 4] [--orders 100]
+        [--json results.json]
+
+Each worker is a separate process, like a gunicorn worker, posting orders
+through the test client to the same temporary database file. Every run uses
+a fresh file, migrated once before the workers start; the second run sets
+``SQLITE_CONCURRENCY_MODE`` (see ``backend/database.py``). A request that
+fails, typically with "database is locked", counts as an error.
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .utils import summarize, write_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_worker_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+        ORDER_EVENTS={"ASYNC": False},
+    ).enable()
+
+
+def worker(barrier, results, orders, seed):
+    import random
+
+    setup_worker_django()
+
+    from django.test import Client
+
+    from core.models import MenuItem, Table
+
+    rng = random.Random(seed)
+    menu = list(MenuItem.objects.values_list("pk", flat=True))
+    tables = list(Table.objects.values_list("pk", flat=True))
+    client = Client()
+    durations, errors = [], 0
+    barrier.wait()
+    started = time.perf_counter()
+    for _ in range(orders):
+        payload = {
+            "table_id": rng.choice(tables),
+            "items": [{"menu_item_id": pk, "quantity": 1} for pk in rng.sample(menu, 3)],
+        }
+        start = time.perf_counter()
+        try:
+            response = client.post("/api/orders/", payload, content_type="application/json")
+            if response.status_code != 201:
+                errors += 1
+        except Exception:
+            errors += 1
+        durations.append((time.perf_counter() - start) * 1000)
+    results.put((durations, errors, time.perf_counter() - started))
+
+
+def run(mode, path, args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "SQLITE_CONCURRENCY_MODE": "True" if mode else "False",
+    }
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate", "-v0"], cwd=ROOT, env=env, check=True
+    )
+    subprocess.run(
+        [
+            sys.executable,
+            "manage.py",
+            "generate_data",
+            "--tables=20",
+            "--menu-items=0",
+            "--orders=0",
+        ],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    saved_environ = dict(os.environ)
+    os.environ.update(env)
+    try:
+        processes = [
+            context.Process(target=worker, args=(barrier, results, args.orders, seed))
+            for seed in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+
+    durations = [
+        duration for worker_durations, _e, _t in outcomes for duration in worker_durations
+    ]
+    result = summarize(durations)
+    result["errors"] = sum(errors for _d, errors, _t in outcomes)
+    result["orders_per_s"] = (len(durations) - result["errors"]) / max(
+        elapsed for _d, _e, elapsed in outcomes
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=100, help="Orders per worker.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results here.")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.orders} orders")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, mode in (("default", False), ("concurrency_mode", True)):
+            result = run(mode, Path(directory) / f"{name}.sqlite3", args)
+            results[name] = result
+            print(
+                f"  {name:<17} {result['orders_per_s']:8.1f} orders/s"
+                f"  p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}"
+                f"  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}"
+            )
+
+    if args.json:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        import django
+
+        django.setup()
+        write_results(args.json, "sqlite_concurrency", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Payload size and encode/decode time: JSON vs MessagePack.
+
+    python -m benchmarks.bench_wire_format [--orders 200] [--lines 5]
+
+Covers the nested and compact order listings, the menu listing and a batch
+of KDS stream events, each encoded with the renderers the API actually uses.
+"""
+
+import argparse
+
+from .utils import measure, seed_orders, setup_django, summarize, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results here.")
+    args = parser.parse_args()
+
+    setup_django()
+
+    import json
+
+    from rest_framework.renderers import JSONRenderer
+
+    from core import compact, events, menu_cache
+    from core.models import Order
+    from core.parsers import unpackb
+    from core.renderers import MessagePackRenderer
+    from core.serializers import ORDER_ITEMS_PREFETCH, MenuItemSerializer, OrderSerializer
+
+    seed_orders(args.orders, args.lines)
+
+    orders = Order.objects.select_related("table").prefetch_related(ORDER_ITEMS_PREFETCH)
+    payloads = {
+        "orders (nested)": OrderSerializer(orders, many=True).data,
+        "orders (compact)": compact.compact_orders(compact.order_rows()),
+        "menu items": MenuItemSerializer(menu_cache.get_menu().items, many=True).data,
+        "stream batch": {
+            "type": "batch",
+            "events": [
+                {"type": "event", "seq": seq, **events.order_payload(order, [events.STATUS])}
+                for seq, order in enumerate(orders[:50], 1)
+            ],
+        },
+    }
+    json_renderer, msgpack_renderer = JSONRenderer(), MessagePackRenderer()
+
+    print(f"{args.orders} orders x {args.lines} lines")
+    print(f"  {'payload':<18} {'format':<8} {'bytes':>9} {'encode p50':>12} {'decode p50':>12}")
+    results = {}
+    for name, data in payloads.items():
+        for fmt, renderer, decode in (
+            ("json", json_renderer, json.loads),
+            ("msgpack", msgpack_renderer, unpackb),
+        ):
+            body = renderer.render(data)
+            encode = summarize(measure(lambda: renderer.render(data), repeat=args.repeat))
+            decoded = summarize(measure(lambda: decode(body), repeat=args.repeat))
+            results.setdefault(name, {})[fmt] = {
+                "bytes": len(body),
+                "encode": encode,
+                "decode": decoded,
+            }
+            print(
+                f"  {name:<18} {fmt:<8} {len(body):>9} {encode['p50_ms']:>9.3f} ms"
+                f" {decoded['p50_ms']:>9.3f} ms"
+            )
+    if args.json:
+        write_results(args.json, "wire_format", args, results)
+
+
+if __name__ == "__main__":
+    main()
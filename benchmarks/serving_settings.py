@@ -0,0 +1,13 @@
+"""Settings for ``bench_serving``'s servers: the project settings, except that
+the channel layer and cache are in-memory unless ``BENCH_REDIS`` is set, so
+the benchmark runs without Redis (events and live counters then stay within
+one worker).
+"""
+
+import os
+
+from backend.settings import *  # noqa: F401,F403
+
+if not os.environ.get("BENCH_REDIS"):
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -0,0 +1,129 @@
+"""Shared helpers for the in-process benchmarks in this package.
+
+Benchmarks run against a throwaway test database (in-memory SQLite with the
+default settings) and the test runner's file-based cache, so they need neither
+``db.sqlite3`` nor Redis. Run them from the
+repository root, e.g. ``python -m benchmarks.bench_order_listing``.
+
+``--json PATH`` writes the numbers with the commit and environment they were
+taken on (:func:`write_results`), so runs can be compared across commits.
+"""
+
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+    from django.db import connection
+
+    from backend.test_runner import TestRunner
+
+    TestRunner().setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+
+
+def seed_orders(orders=200, lines=5, seed=0):
+    """Create ``orders`` orders of ``lines`` lines each over the seeded menu."""
+    from core.models import MenuItem, Order, OrderItem, Table
+
+    rng = random.Random(seed)
+    menu = list(MenuItem.objects.all())
+    tables = Table.objects.bulk_create(
+        Table(table_number=1000 + i, capacity=4) for i in range(max(1, orders // 10))
+    )
+    order_rows = Order.objects.bulk_create(
+        Order(
+            table=rng.choice(tables),
+            status=rng.choice([value for value, _label in Order.STATUS_CHOICES]),
+            total_price=Decimal("0"),
+        )
+        for _ in range(orders)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            menu_item=menu_item,
+            quantity=quantity,
+            line_total=menu_item.price * quantity,
+        )
+        for order in order_rows
+        for menu_item, quantity in (
+            (rng.choice(menu), rng.randint(1, 3)) for _ in range(lines)
+        )
+    )
+    return order_rows
+
+
+def measure(func, repeat=20, warmup=2):
+    """Run ``func`` and return per-call durations in milliseconds."""
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, benchmark, args, results):
+    """Write ``results`` to ``path`` as JSON, with the run's parameters and environment."""
+    import django
+    from django.db import connection
+
+    document = {
+        "benchmark": benchmark,
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "parameters": {key: value for key, value in vars(args).items() if key != "json"},
+        "results": results,
+    }
+    with open(path, "w") as output:
+        json.dump(document, output, indent=2, sort_keys=True, default=str)
+        output.write("\n")
@@ -1,12 +1,38 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Sum
 
-from .models import Category, MenuItem, Order, OrderItem, StaffProfile, Table
+from . import billing, conditional, events, menu_cache
+from .models import (
+	ArchivedOrder,
+	ArchivedOrderItem,
+	Category,
+	MenuItem,
+	Order,
+	OrderItem,
+	StaffProfile,
+	Table,
+	Tag,
+)
 
 
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
 	list_display = ("table_number", "capacity", "status", "opened_at", "closed_at")
 	list_filter = ("status",)
+	actions = ["close_sessions"]
+
+	@admin.action(description="Close the selected tables' sessions and bill them")
+	def close_sessions(self, request, queryset):
+		for table in queryset.filter(status=Table.STATUS_OCCUPIED):
+			try:
+				bill = billing.close_session(table.pk)
+			except billing.SessionNotOpen:
+				continue  # Closed meanwhile.
+			self.message_user(
+				request,
+				f"Table {bill.table_number}: {len(bill.order_ids)} order(s), total {bill.total}",
+			)
 
 
 @admin.register(Category)
@@ -14,23 +40,103 @@ class CategoryAdmin(admin.ModelAdmin):
 	list_display = ("name",)
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+	list_display = ("name", "slug")
+	prepopulated_fields = {"slug": ("name",)}
+
+
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
-	list_display = ("name", "category", "price", "is_available")
-	list_filter = ("category", "is_available")
+	list_display = ("name", "category", "price", "diet", "is_available")
+	list_filter = ("category", "diet", "tags", "is_available")
+	filter_horizontal = ("tags",)
+	actions = ["mark_available", "mark_unavailable"]
+
+	@admin.action(description="Mark selected items as available")
+	def mark_available(self, request, queryset):
+		# queryset.update() skips the post_save signal, so invalidate explicitly.
+		queryset.update(is_available=True)
+		conditional.bump(conditional.MENU)
+		transaction.on_commit(menu_cache.invalidate)
+
+	@admin.action(description="Mark selected items as unavailable")
+	def mark_unavailable(self, request, queryset):
+		queryset.update(is_available=False)
+		conditional.bump(conditional.MENU)
+		transaction.on_commit(menu_cache.invalidate)
 
 
 class OrderItemInline(admin.TabularInline):
 	model = OrderItem
 	extra = 0
 
+	def get_queryset(self, request):
+		# Each row's heading is OrderItem.__str__, which names the menu item.
+		return super().get_queryset(request).select_related("menu_item")
+
+	def formfield_for_foreignkey(self, db_field, request, **kwargs):
+		formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+		if db_field.name == "menu_item":
+			# Evaluate the menu once per request; otherwise every inline row
+			# (and the empty template row) re-queries it to render its select.
+			if not hasattr(request, "_menu_item_choices"):
+				request._menu_item_choices = list(formfield.choices)
+			formfield.choices = request._menu_item_choices
+		return formfield
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
 	list_display = ("id", "table", "status", "total_price", "created_at", "updated_at")
 	list_filter = ("status", "table")
+	# Each row shows Table.__str__.
+	list_select_related = ("table",)
 	inlines = [OrderItemInline]
 
+	def save_related(self, request, form, formsets, change):
+		super().save_related(request, form, formsets, change)
+		if any(formset.has_changed() for formset in formsets):
+			# Inline lines were edited: refresh the total, which also moves the
+			# order's updated_at (ETag) and publishes an items event.
+			order = form.instance
+			order.total_price = order.items.aggregate(total=Sum("line_total"))["total"] or 0
+			events.note_change(order, events.ITEMS)
+			order.save(update_fields=["total_price", "updated_at"])
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+	model = ArchivedOrderItem
+	extra = 0
+	fields = ("menu_item", "quantity", "custom_notes", "line_total")
+	readonly_fields = fields
+	can_delete = False
+
+	def get_queryset(self, request):
+		return super().get_queryset(request).select_related("menu_item")
+
+	def has_add_permission(self, request, obj=None):
+		return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+	"""Read-only: archived orders are history (see core.archive)."""
+
+	list_display = ("id", "table", "total_price", "created_at", "closed_at")
+	list_select_related = ("table",)
+	date_hierarchy = "created_at"
+	inlines = [ArchivedOrderItemInline]
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
+
 
 @admin.register(StaffProfile)
 class StaffProfileAdmin(admin.ModelAdmin):
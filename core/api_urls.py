@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
+from . import async_views
 from .api_views import CategoryViewSet, MenuItemViewSet, OrderViewSet, TableViewSet
 
 router = DefaultRouter()
@@ -14,5 +15,14 @@ router.register(r"orders", OrderViewSet, basename="order")
 urlpatterns = [
     path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    # Async fast paths for the polled reads (core.async_views); they hand
+    # everything else to the router's views below.
+    path("orders/<int:pk>/", async_views.order_detail, name="order-detail-async"),
+    path("tables/", async_views.table_list, name="table-list-async"),
+    path("tables/<int:pk>/", async_views.table_detail, name="table-detail-async"),
     path("", include(router.urls)),
+    # The same reads through the sync viewsets only, for comparison.
+    path("sync/orders/<int:pk>/", OrderViewSet.as_view({"get": "retrieve"})),
+    path("sync/tables/", TableViewSet.as_view({"get": "list"})),
+    path("sync/tables/<int:pk>/", TableViewSet.as_view({"get": "retrieve"})),
 ]
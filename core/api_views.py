@@ -1,7 +1,20 @@
+from django.db import router
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 
+from . import billing, compact, conditional, export, menu_cache, search
+from .db_router import ReplicaReadsMixin
+from .filters import OrderFilterBackend
 from .models import Category, MenuItem, Order, Table
+from .pagination import KeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer
 from .serializers import (
+    ORDER_ITEMS_PREFETCH,
     CategorySerializer,
     MenuItemSerializer,
     OrderSerializer,
@@ -16,30 +29,213 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return bool(request.user and request.user.is_staff)
 
 
-class TableViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """Answer conditional list/retrieve requests from ``get_stamp()``.
+
+    The check runs after authentication, permissions and content negotiation
+    but before any queryset is evaluated or serializer is built. The
+    browsable API is skipped because its pages embed per-user forms.
+    """
+
+    def get_stamp(self):
+        return None
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        renderer_format = request.accepted_renderer.format
+        stamp = None if renderer_format == "api" else self.get_stamp()
+        if stamp is None:
+            return handler(request, *args, **kwargs)
+        stamp = stamp.with_suffix(renderer_format)
+        response = conditional.not_modified(request, stamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return conditional.apply_stamp(response, stamp)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+
+class MenuSnapshotListMixin:
+    """List straight from the shared menu snapshot instead of the database."""
+
+    snapshot_attr = ""
+
+    def list(self, request, *args, **kwargs):
+        objects = self.filter_snapshot(getattr(menu_cache.get_menu(), self.snapshot_attr))
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+    def filter_snapshot(self, objects):
+        return objects
+
+
+class SessionNotOpen(APIException):
+    status_code = 409
+    default_detail = "This table has no open session."
+    default_code = "session_not_open"
+
+
+class TableViewSet(ReplicaReadsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Table.objects.all().order_by("table_number")
     serializer_class = TableSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_stamp(self):
+        return conditional.counter_stamp(conditional.TABLE)
+
+    @action(detail=True, permission_classes=[permissions.IsAdminUser])
+    def bill(self, request, pk=None):
+        """The running itemized bill of the table's open session (core.billing)."""
+        try:
+            bill = billing.compute_bill(self.get_object())
+        except billing.SessionNotOpen as exc:
+            raise SessionNotOpen(str(exc))
+        return Response(bill.as_data())
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=["post"], permission_classes=[permissions.IsAdminUser])
+    def close(self, request, pk=None):
+        """Close the session: bill it, close its orders and free the table."""
+        try:
+            bill = billing.close_session(self.get_object().pk)
+        except billing.SessionNotOpen as exc:
+            raise SessionNotOpen(str(exc))
+        return Response(bill.as_data())
+
+
+class CategoryViewSet(
+    ReplicaReadsMixin, ConditionalGetMixin, MenuSnapshotListMixin, viewsets.ModelViewSet
+):
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    snapshot_attr = "categories"
 
+    def get_stamp(self):
+        return menu_cache.get_menu().stamp
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+
+class MenuItemViewSet(
+    ReplicaReadsMixin, ConditionalGetMixin, MenuSnapshotListMixin, viewsets.ModelViewSet
+):
     queryset = MenuItem.objects.all().select_related("category").order_by("name")
     serializer_class = MenuItemSerializer
     permission_classes = [IsAdminOrReadOnly]
+    snapshot_attr = "items"
+    replica_actions = ("list", "retrieve", "search")
+
+    def get_stamp(self):
+        return menu_cache.get_menu().stamp
 
+    def filter_snapshot(self, objects):
+        """``?diet=veg,egg`` keeps those diets; ``?tag=a,b`` needs every tag."""
+        params = self.request.query_params
+        if params.get("diet"):
+            diets = set(params["diet"].split(","))
+            objects = [item for item in objects if item.diet in diets]
+        if params.get("tag"):
+            tags = set(params["tag"].split(","))
+            objects = [item for item in objects if tags <= {tag.slug for tag in item.tags.all()}]
+        return objects
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @action(detail=False)
+    def search(self, request):
+        """Name/description search: ``?q=pan tik`` (see core.search)."""
+        menu = menu_cache.get_menu()
+        ids = search.menu_item_ids(request.query_params.get("q", ""))
+        items = [item for item in map(menu.get_item, ids) if item is not None]
+        serializer = self.get_serializer(self.filter_snapshot(items), many=True)
+        return Response(serializer.data)
+
+
+class OrderViewSet(ReplicaReadsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = (
         Order.objects.all()
         .select_related("table")
-        .prefetch_related("items__menu_item")
+        .prefetch_related(ORDER_ITEMS_PREFETCH)
         .order_by("-created_at")
     )
     serializer_class = OrderSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderFilterBackend]
+    replica_actions = ("list", "retrieve", "export")
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("view") == "compact":
+            return self.compact_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def compact_list(self, request):
+        """Flat listing built from values() rows; see core.compact."""
+        queryset = compact.order_rows(self.filter_queryset(Order.objects.all()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(compact.compact_orders(page))
+
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAdminUser],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream orders created between ``?since=`` and ``?until=`` (core.export).
+
+        Both dates are inclusive; ``until`` defaults to today. Pick the format
+        with ``?format=ndjson`` (default) or ``?format=csv``, or ``Accept``.
+        """
+        since = self._date_param("since", required=True)
+        until = self._date_param("until") or timezone.localdate()
+        if until < since:
+            raise ValidationError({"until": "Must not be before since."})
+        return export.export_response(
+            request,
+            request.accepted_renderer.format,
+            since,
+            until,
+            # Rows are read while streaming, after this request's routing ends.
+            using=router.db_for_read(Order),
+        )
+
+    def handle_exception(self, exc):
+        if self.action == "export":
+            # The export's renderers only label its streamed body; errors
+            # are sent as plain JSON whichever format was negotiated.
+            self.request.accepted_renderer = JSONRenderer()
+            self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+    def _date_param(self, name, required=False):
+        value = self.request.query_params.get(name)
+        if not value:
+            if required:
+                raise ValidationError({name: "This parameter is required (YYYY-MM-DD)."})
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: "Use YYYY-MM-DD."})
+        return day
+
+    def get_stamp(self):
+        if self.action != "retrieve":
+            return None
+        try:
+            order_id = int(self.kwargs["pk"])
+        except ValueError:
+            return None
+        return conditional.order_stamp(order_id)
+
+    def update(self, request, *args, **kwargs):
+        # Same as UpdateModelMixin.update minus its blanket prefetch reset:
+        # OrderSerializer.update refreshes the items prefetch itself, and
+        # dropping it would re-fetch every line's menu item one at a time.
+        partial = kwargs.pop("partial", False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data)
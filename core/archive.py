@@ -0,0 +1,117 @@
+"""Move old closed orders out of the live ``Order``/``OrderItem`` tables.
+
+Open orders, the KDS stream, table occupancy and the order API all filter
+``Order`` by status, so years of closed orders make every one of those
+queries and indexes bigger. :func:`archive_orders` (``manage.py
+archive_orders``) moves orders closed more than N days ago, with their
+lines, into ``ArchivedOrder``/``ArchivedOrderItem``, one chunk per
+transaction.
+
+Archived orders keep their ids. They were counted in the rollups when they
+were served, so archiving leaves ``DailyRevenue``/``DailyItemSales`` alone.
+Readers of order history go through both stores: ``rollups.rebuild`` sums
+them, and the tracking page finds an order in either with :func:`find_order`.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from . import signals
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ORDER_FIELDS = [
+    "id",
+    "table_id",
+    "total_price",
+    "created_at",
+    "updated_at",
+    "special_instructions",
+    "served_by_id",
+]
+LINE_FIELDS = ["order_id", "menu_item_id", "quantity", "custom_notes", "line_total"]
+
+
+def archivable(days):
+    """Live orders closed (last updated) more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Order.objects.filter(status=Order.STATUS_CLOSED, updated_at__lt=cutoff)
+
+
+def archive_chunk(queryset, chunk_size):
+    """Archive up to ``chunk_size`` orders of ``queryset``; returns how many."""
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update().order_by("pk").values(*ORDER_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return 0
+        ids = [row["id"] for row in rows]
+        lines = OrderItem.objects.filter(order_id__in=ids)
+        ArchivedOrder.objects.bulk_create(
+            (ArchivedOrder(closed_at=row.pop("updated_at"), **row) for row in rows),
+            batch_size=1000,
+        )
+        ArchivedOrderItem.objects.bulk_create(
+            [ArchivedOrderItem(**line) for line in lines.values(*LINE_FIELDS)],
+            batch_size=1000,
+        )
+        # Without the delete hooks: they would take these orders out of the
+        # rollups, and none of the live counters include closed orders.
+        with signals.skip_order_hooks():
+            Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(days, chunk_size=1000, progress=None):
+    """Move orders closed more than ``days`` days ago; returns how many moved.
+
+    ``progress(moved)`` is called after each chunk commits.
+    """
+    queryset = archivable(days)
+    moved = 0
+    while count := archive_chunk(queryset, chunk_size):
+        moved += count
+        if progress is not None:
+            progress(moved)
+    return moved
+
+
+def _archived_order(order_id):
+    return (
+        ArchivedOrder.objects.select_related("table")
+        .prefetch_related(
+            Prefetch("items", queryset=ArchivedOrderItem.objects.select_related("menu_item"))
+        )
+        .filter(pk=order_id)
+    )
+
+
+def _live_orders(queryset):
+    if queryset is None:
+        queryset = Order.objects.select_related("table").prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("menu_item"))
+        )
+    return queryset
+
+
+def find_order(order_id, queryset=None):
+    """The order with ``order_id`` from ``queryset`` (live orders) or the archive.
+
+    Returns None if neither has it. Either kind has ``table``, ``status`` and
+    ``items`` with their ``menu_item`` loaded.
+    """
+    order = _live_orders(queryset).filter(pk=order_id).first()
+    if order is not None:
+        return order
+    return _archived_order(order_id).first()
+
+
+async def afind_order(order_id, queryset=None):
+    """Async :func:`find_order`."""
+    order = await _live_orders(queryset).filter(pk=order_id).afirst()
+    if order is not None:
+        return order
+    return await _archived_order(order_id).afirst()
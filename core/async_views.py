@@ -0,0 +1,163 @@
+"""Async versions of the most polled read endpoints.
+
+Every seated guest's phone polls its order's tracking page and
+``GET /api/orders/<id>/``, and table screens poll ``/api/tables/``. Under
+ASGI, Django hands each sync view to a thread started for its request and
+waits for it through an executor. These views use the async ORM instead:
+only the queries make that hop, while negotiation, conditional checks,
+serialization and rendering stay on the event loop.
+
+They stay async only while every middleware is async-capable; a sync-only
+middleware would put the whole request back on a thread. That includes
+``RequestMetricsMiddleware``, which handles both.
+
+The API views answer anonymous GET/HEAD in JSON or MessagePack with the same
+body, ETag and 304 handling as the viewsets (``ConditionalGetMixin``). The
+regular DRF view still handles everything else, so ``PUT /api/orders/<id>/``,
+bad tokens, the browsable API and 404s behave exactly as before. The
+sync-only routes stay under ``/order/track/<id>/sync/`` and ``/api/sync/``
+so the two can be benchmarked side by side.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import archive, conditional
+from .api_views import OrderViewSet, TableViewSet
+from .db_router import replica_reads, uses_replica
+from .models import Order, Table
+from .serializers import OrderSerializer, TableSerializer
+from .views import ITEMS_WITH_MENU_ITEM
+
+# What the router maps these paths to, for everything the fast path declines.
+order_detail_sync = OrderViewSet.as_view(
+    {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+)
+table_list_sync = TableViewSet.as_view({"get": "list", "post": "create"})
+table_detail_sync = TableViewSet.as_view(
+    {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+)
+
+
+def negotiate(request):
+    """A DRF request with its accepted renderer, if the fast path can answer it.
+
+    Returns None for writes, requests carrying credentials (an invalid
+    token must still get DRF's 401), the browsable API and unacceptable
+    ``Accept`` headers.
+    """
+    if request.method not in ("GET", "HEAD") or "Authorization" in request.headers:
+        return None
+    drf_request = Request(request)
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(
+            drf_request, renderers
+        )
+    except NotAcceptable:
+        return None
+    if renderer.format == "api":
+        return None
+    drf_request.accepted_renderer = renderer
+    drf_request.accepted_media_type = media_type
+    return drf_request
+
+
+def render_data(drf_request, data):
+    renderer = drf_request.accepted_renderer
+    content_type = drf_request.accepted_media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    body = renderer.render(data, drf_request.accepted_media_type, {"request": drf_request})
+    response = HttpResponse(body, content_type=content_type)
+    # Not a DRF Response, whose render() the handler would run on the sync
+    # thread; keep its ``data`` for callers and tests all the same.
+    response.data = data
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+async def fast_read(request, sync_view, get_stamp, load, serializer_class, **kwargs):
+    """Serve ``request`` from ``await load()`` if it can, else from ``sync_view``.
+
+    ``get_stamp`` returns the conditional stamp, or None when the object is
+    missing; ``load`` returns the instance (or a list of them), or None.
+    """
+    drf_request = negotiate(request)
+    stamp = None if drf_request is None else await get_stamp()
+    if stamp is None:
+        return await sync_to_async(sync_view)(request, **kwargs)
+    stamp = stamp.with_suffix(drf_request.accepted_renderer.format)
+    response = conditional.not_modified(request, stamp)
+    if response is None:
+        instance = await load()
+        if instance is None:
+            return await sync_to_async(sync_view)(request, **kwargs)
+        serializer = serializer_class(
+            instance, many=isinstance(instance, list), context={"request": drf_request}
+        )
+        response = render_data(drf_request, serializer.data)
+    return conditional.apply_stamp(response, stamp)
+
+
+@csrf_exempt
+@uses_replica
+async def order_detail(request, pk):
+    return await fast_read(
+        request,
+        order_detail_sync,
+        lambda: conditional.aorder_stamp(pk),
+        lambda: OrderViewSet.queryset.filter(pk=pk).afirst(),
+        OrderSerializer,
+        pk=pk,
+    )
+
+
+async def _tables():
+    return [table async for table in TableViewSet.queryset]
+
+
+@csrf_exempt
+@uses_replica
+async def table_list(request):
+    return await fast_read(
+        request,
+        table_list_sync,
+        lambda: conditional.acounter_stamp(conditional.TABLE),
+        _tables,
+        TableSerializer,
+    )
+
+
+@csrf_exempt
+@uses_replica
+async def table_detail(request, pk):
+    return await fast_read(
+        request,
+        table_detail_sync,
+        lambda: conditional.acounter_stamp(conditional.TABLE),
+        lambda: Table.objects.filter(pk=pk).afirst(),
+        TableSerializer,
+        pk=pk,
+    )
+
+
+@uses_replica
+@conditional.conditional_on(lambda request, order_id: conditional.aorder_stamp(order_id))
+async def order_status_page(request, order_id):
+    queryset = Order.objects.select_related("table").prefetch_related(ITEMS_WITH_MENU_ITEM)
+    order = await archive.afind_order(order_id, queryset)
+    if order is None:
+        # Possibly not on the replica yet (see views.order_status_page).
+        with replica_reads(False):
+            order = await archive.afind_order(order_id, queryset)
+    if order is None:
+        raise Http404("No order matches the given query.")
+    return render(request, "core/order_status.html", {"order": order})
@@ -0,0 +1,174 @@
+"""Table sessions: the itemized bill for a table, and closing it.
+
+A session starts when a table's first order makes it occupied
+(``Table.opened_at``) and ends with :func:`close_session`. Its orders are
+the table's orders created since ``opened_at`` plus any it still has open.
+
+:func:`compute_bill` reads the orders in one query and the itemized lines
+in one aggregate query. :func:`close_session` bills the table, closes every
+open order with one UPDATE and frees the table, all in one transaction, in
+the same number of queries however busy the table was. The UPDATE skips
+Order's post_save handlers, so it does their work for the whole session at
+once: rollups for orders that had not been served yet (``rollups.apply_many``),
+the open-order counter, and one status event per order.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import events, live_stats, rollups
+from .models import Order, OrderItem, Table
+
+
+CENTS = Decimal("0.01")
+
+
+class SessionNotOpen(Exception):
+    pass
+
+
+def _money(value):
+    # SUM() over a DecimalField loses its scale on SQLite.
+    return str(Decimal(value).quantize(CENTS))
+
+
+class Bill(NamedTuple):
+    table_id: int
+    table_number: int
+    opened_at: Optional[object]
+    closed_at: Optional[object]
+    order_ids: list
+    items: list
+    total: Decimal
+
+    def as_data(self):
+        """JSON-ready form, with amounts as strings like the order API."""
+        return {
+            "table_id": self.table_id,
+            "table": self.table_number,
+            "opened_at": self.opened_at,
+            "closed_at": self.closed_at,
+            "orders": self.order_ids,
+            "items": [{**item, "amount": _money(item["amount"])} for item in self.items],
+            "total": _money(self.total),
+        }
+
+
+def session_orders(table):
+    """The orders of ``table``'s current session."""
+    in_session = ~Q(status=Order.STATUS_CLOSED)
+    if table.opened_at is not None:
+        in_session |= Q(created_at__gte=table.opened_at)
+    return Order.objects.filter(in_session, table=table)
+
+
+def _read_session(table):
+    """``(orders, lines)`` of the session.
+
+    Lines are totalled per menu item, order day and whether the order is
+    already counted in the rollups.
+    """
+    orders = session_orders(table)
+    order_rows = list(
+        orders.order_by("id").values("id", "status", "total_price", "created_at", "updated_at")
+    )
+    line_rows = list(
+        OrderItem.objects.filter(order__in=orders)
+        .values(
+            "menu_item_id",
+            name=F("menu_item__name"),
+            day=TruncDate("order__created_at"),
+            counted=Case(
+                When(order__status__in=rollups.REVENUE_STATUSES, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+        .annotate(line_count=Count("id"), quantity=Sum("quantity"), amount=Sum("line_total"))
+        .order_by()
+    )
+    return order_rows, line_rows
+
+
+def _bill(table, order_rows, line_rows, closed_at=None):
+    items = {}
+    for row in line_rows:
+        item = items.setdefault(
+            row["menu_item_id"],
+            {
+                "menu_item_id": row["menu_item_id"],
+                "name": row["name"],
+                "quantity": 0,
+                "amount": 0,
+            },
+        )
+        item["quantity"] += row["quantity"]
+        item["amount"] += row["amount"]
+    return Bill(
+        table_id=table.pk,
+        table_number=table.table_number,
+        opened_at=table.opened_at,
+        closed_at=closed_at,
+        order_ids=[row["id"] for row in order_rows],
+        items=sorted(items.values(), key=lambda item: item["name"]),
+        total=sum((row["total_price"] for row in order_rows), Decimal("0")),
+    )
+
+
+def compute_bill(table):
+    """The running bill of ``table``'s open session."""
+    if table.status != Table.STATUS_OCCUPIED:
+        raise SessionNotOpen(f"Table {table.table_number} has no open session.")
+    return _bill(table, *_read_session(table))
+
+
+def close_session(table_id):
+    """Bill and close the open session of a table; returns the :class:`Bill`."""
+    with transaction.atomic():
+        table = Table.objects.select_for_update().get(pk=table_id)
+        if table.status != Table.STATUS_OCCUPIED:
+            raise SessionNotOpen(f"Table {table.table_number} has no open session.")
+        order_rows, line_rows = _read_session(table)
+        now = timezone.now()
+        closing = [row for row in order_rows if row["status"] != Order.STATUS_CLOSED]
+        # Only the orders that were read: one placed meanwhile stays open
+        # and starts the table's next session.
+        Order.objects.filter(pk__in=[row["id"] for row in closing]).update(
+            status=Order.STATUS_CLOSED, updated_at=now
+        )
+
+        revenue = defaultdict(lambda: [0, Decimal("0")])
+        for row in closing:
+            if row["status"] not in rollups.REVENUE_STATUSES:
+                totals = revenue[timezone.localdate(row["created_at"])]
+                totals[0] += 1
+                totals[1] += row["total_price"]
+        sales = defaultdict(lambda: [0, 0])
+        for row in line_rows:
+            if not row["counted"]:
+                totals = sales[row["day"], row["menu_item_id"]]
+                totals[0] += row["line_count"]
+                totals[1] += row["quantity"]
+        rollups.apply_many(revenue, sales)
+        live_stats.orders_changed((row["status"], Order.STATUS_CLOSED) for row in closing)
+        for row in closing:
+            order = Order(
+                id=row["id"],
+                table=table,
+                status=Order.STATUS_CLOSED,
+                total_price=row["total_price"],
+                created_at=row["created_at"],
+                updated_at=now,
+            )
+            events.publish_order(order, {events.STATUS}, row["status"])
+
+        table.status = Table.STATUS_AVAILABLE
+        table.closed_at = now
+        table.save(update_fields=["status", "closed_at"])
+    return _bill(table, order_rows, line_rows, closed_at=now)
@@ -0,0 +1,69 @@
+"""Flat, read-only order representation built straight from ``values()`` rows.
+
+Kitchen screens only need "2 × Dal Tadka" per line, so instead of building a
+nested serializer tree per order this reads two flat row sets (orders, then
+their lines joined to the menu item name) and assembles plain dicts without
+instantiating any model.
+"""
+
+from collections import defaultdict
+
+from .models import Order, OrderItem
+
+ORDER_FIELDS = (
+    "id",
+    "table_id",
+    "table__table_number",
+    "status",
+    "total_price",
+    "created_at",
+    "updated_at",
+)
+ITEM_FIELDS = ("order_id", "id", "menu_item_id", "menu_item__name", "quantity", "custom_notes")
+
+
+def _iso(value):
+    # Same shape as DRF's DateTimeField output.
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def order_rows(queryset=None):
+    """``values()`` queryset with the columns :func:`compact_orders` needs."""
+    if queryset is None:
+        queryset = Order.objects.all()
+    return queryset.values(*ORDER_FIELDS)
+
+
+def compact_orders(rows):
+    """Turn ``order_rows()`` dicts into compact orders with one extra query."""
+    rows = list(rows)
+    lines = defaultdict(list)
+    if rows:
+        item_rows = (
+            OrderItem.objects.filter(order_id__in=[row["id"] for row in rows])
+            .order_by("id")
+            .values_list(*ITEM_FIELDS)
+        )
+        for order_id, item_id, menu_item_id, name, quantity, notes in item_rows:
+            lines[order_id].append(
+                {
+                    "id": item_id,
+                    "menu_item_id": menu_item_id,
+                    "name": name,
+                    "quantity": quantity,
+                    "notes": notes,
+                }
+            )
+    return [
+        {
+            "id": row["id"],
+            "table_id": row["table_id"],
+            "table": row["table__table_number"],
+            "status": row["status"],
+            "total_price": str(row["total_price"]),
+            "created_at": _iso(row["created_at"]),
+            "updated_at": _iso(row["updated_at"]),
+            "items": lines[row["id"]],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,173 @@
+"""Conditional GET support (ETag / Last-Modified) from cheap version stamps.
+
+Polling clients re-fetch the menu, the table list and individual orders over
+and over. Rather than hashing a rendered body, each response is stamped with
+versions that can be read in a single small query:
+
+* ``ChangeCounter`` rows, bumped in the same transaction as any change to the
+  models they cover (``"menu"`` for MenuItem/Category, ``"table"`` for Table);
+* ``Order.updated_at`` for a single order.
+
+When the client's validators match, the view answers 304 before any queryset
+is evaluated or any serializer runs.
+"""
+
+import asyncio
+from functools import wraps
+from typing import NamedTuple, Optional
+
+from django.db.models import F, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import ChangeCounter, Order
+
+MENU = "menu"
+TABLE = "table"
+
+
+class Stamp(NamedTuple):
+    etag: str
+    last_modified: Optional[object] = None
+
+    def with_suffix(self, suffix):
+        return self._replace(etag=f"{self.etag}.{suffix}")
+
+
+def bump(*names):
+    """Record a change to ``names``; call inside the writing transaction."""
+    now = timezone.now()
+    for name in names:
+        updated = ChangeCounter.objects.filter(name=name).update(
+            value=F("value") + 1, updated_at=now
+        )
+        if not updated:
+            ChangeCounter.objects.get_or_create(name=name, defaults={"value": 1})
+
+
+def _combine(parts, timestamps):
+    timestamps = [ts for ts in timestamps if ts is not None]
+    return Stamp("-".join(parts), max(timestamps) if timestamps else None)
+
+
+def _counter_rows(names):
+    return ChangeCounter.objects.filter(name__in=names).values_list(
+        "name", "value", "updated_at"
+    )
+
+
+def _counter_stamp(names, rows):
+    rows = {name: (value, updated_at) for name, value, updated_at in rows}
+    values = [rows.get(name, (0, None)) for name in names]
+    return _combine(
+        [f"{name}{value}" for name, (value, _ts) in zip(names, values)],
+        [ts for _value, ts in values],
+    )
+
+
+def counter_stamp(*names):
+    """Stamp for the given change counters, read in one query."""
+    return _counter_stamp(names, _counter_rows(names))
+
+
+async def acounter_stamp(*names):
+    """Async :func:`counter_stamp`."""
+    return _counter_stamp(names, [row async for row in _counter_rows(names)])
+
+
+def _order_row(order_id):
+    return (
+        Order.objects.filter(pk=order_id)
+        .annotate(
+            table_version=Subquery(
+                ChangeCounter.objects.filter(name=TABLE).values("value")[:1]
+            ),
+            menu_version=Subquery(
+                ChangeCounter.objects.filter(name=MENU).values("value")[:1]
+            ),
+        )
+        .values_list("updated_at", "table_version", "menu_version")
+    )
+
+
+def _order_stamp(order_id, row):
+    if row is None:
+        return None
+    updated_at, table_version, menu_version = row
+    return Stamp(
+        f"order{order_id}-{updated_at.timestamp()}-{TABLE}{table_version or 0}"
+        f"-{MENU}{menu_version or 0}",
+        updated_at,
+    )
+
+
+def order_stamp(order_id):
+    """Stamp for one order and the table/menu rows it embeds, or None if missing."""
+    return _order_stamp(order_id, _order_row(order_id).first())
+
+
+async def aorder_stamp(order_id):
+    """Async :func:`order_stamp`."""
+    return _order_stamp(order_id, await _order_row(order_id).afirst())
+
+
+def not_modified(request, stamp):
+    """Return a 304 response if ``request`` already has ``stamp``, else None."""
+    last_modified = (
+        int(stamp.last_modified.timestamp()) if stamp.last_modified else None
+    )
+    return get_conditional_response(
+        request, etag=quote_etag(stamp.etag), last_modified=last_modified
+    )
+
+
+def apply_stamp(response, stamp):
+    if response.status_code in (200, 304):
+        response.headers.setdefault("ETag", quote_etag(stamp.etag))
+        if stamp.last_modified is not None:
+            response.headers.setdefault(
+                "Last-Modified", http_date(stamp.last_modified.timestamp())
+            )
+    return response
+
+
+def conditional_on(stamp_func):
+    """Decorate a function view with a ``stamp_func(request, *args, **kwargs)``.
+
+    ``stamp_func`` may return None to skip conditional handling. For an async
+    view it must be async too.
+    """
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def async_inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view_func(request, *args, **kwargs)
+                stamp = await stamp_func(request, *args, **kwargs)
+                if stamp is None:
+                    return await view_func(request, *args, **kwargs)
+                response = not_modified(request, stamp)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return apply_stamp(response, stamp)
+
+            return async_inner
+
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+            stamp = stamp_func(request, *args, **kwargs)
+            if stamp is None:
+                return view_func(request, *args, **kwargs)
+            response = not_modified(request, stamp)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return apply_stamp(response, stamp)
+
+        return inner
+
+    return decorator
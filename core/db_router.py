@@ -0,0 +1,122 @@
+"""Send read-only traffic to a replica database.
+
+When ``DATABASES`` has a ``replica`` alias (``DATABASE_REPLICA_URL``), reads
+made inside :func:`replica_reads` go to it: function views opt in with
+:func:`uses_replica`, viewsets with :class:`ReplicaReadsMixin` (``list`` and
+``retrieve`` by default). Everything else reads from ``default``, and so
+does the rest of a block once it has written anything, so a request always
+sees its own changes. Without a replica alias the router changes nothing,
+and neither does it while the alias mirrors the primary: the test runner
+points it at the test database (``TEST["MIRROR"]``), and reads then stay on
+the primary's connection, inside each test's transaction.
+
+Caches that are rebuilt right after a write (the menu snapshot, the live
+counters) wrap their loads in ``replica_reads(False)`` so a lagging replica
+cannot put stale rows back into them.
+
+A replica may lag, so a client can miss its own write if it reads it back
+in a *new* request before the replica has caught up.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = "replica"
+
+_routing = ContextVar("db_routing", default=None)
+
+
+class _Routing:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica, wrote=False):
+        self.replica = replica
+        self.wrote = wrote
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route reads in this block to the replica (or, with False, away from it)."""
+    outer = _routing.get()
+    routing = _Routing(enabled, wrote=outer is not None and outer.wrote)
+    token = _routing.set(routing)
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+        if outer is not None and routing.wrote:
+            outer.wrote = True
+
+
+def uses_replica(view_func):
+    """Decorate a read-only function view (sync or async) with :func:`replica_reads`."""
+    if asyncio.iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_inner(request, *args, **kwargs):
+            with replica_reads(request.method in ("GET", "HEAD")):
+                return await view_func(request, *args, **kwargs)
+
+        return async_inner
+
+    @wraps(view_func)
+    def inner(request, *args, **kwargs):
+        with replica_reads(request.method in ("GET", "HEAD")):
+            return view_func(request, *args, **kwargs)
+
+    return inner
+
+
+class ReplicaReadsMixin:
+    """Serve the ``replica_actions`` of a viewset from the replica."""
+
+    replica_actions = ("list", "retrieve")
+
+    def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        action = self.action_map.get("get" if method == "head" else method)
+        with replica_reads(action in self.replica_actions):
+            return super().dispatch(request, *args, **kwargs)
+
+
+def mirrors_primary():
+    """Whether the replica alias points at the primary database, as under test."""
+    replica, primary = settings.DATABASES[REPLICA], settings.DATABASES[DEFAULT_DB_ALIAS]
+    return all(replica.get(key) == primary.get(key) for key in ("ENGINE", "HOST", "PORT", "NAME"))
+
+
+def replica_alias():
+    """The alias reads go to right now, if not ``default``."""
+    routing = _routing.get()
+    if routing is None or not routing.replica or routing.wrote:
+        return None
+    if REPLICA not in settings.DATABASES or mirrors_primary():
+        return None
+    return REPLICA
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        # Also for instances that were loaded from the replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own.
+        return False if db == REPLICA else None
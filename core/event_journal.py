@@ -0,0 +1,118 @@
+"""Sequence numbers and a replay buffer for the KDS event stream.
+
+A kitchen tablet that drops off Wi-Fi should not have to reload every open
+order when it reconnects. Each process numbers the order events it sees and
+keeps the most recent ones in a bounded ring buffer; a reconnecting client
+sends back the ``(epoch, seq)`` of the last event it processed and is sent
+only what it missed. The epoch changes whenever continuity can no longer be
+guaranteed (new process, new event loop, or the follower task dying), and a
+client whose cursor is from another epoch or older than the buffer gets a
+compact snapshot instead.
+
+Sequence numbers are per process: with several ASGI workers a client that
+reconnects to a different worker simply sees a different epoch.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+
+from django.conf import settings
+
+from . import events
+
+logger = logging.getLogger(__name__)
+
+# Channel layers expire group membership (a day by default for Redis); the
+# follower re-joins well before that.
+GROUP_REFRESH_SECONDS = 3600
+
+
+class EventJournal:
+    def __init__(self, size=1000):
+        self.size = size
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._buffer = deque()
+        self._seq_by_event_id = {}
+        self._follower = None
+        self._loop = None
+
+    def reset(self):
+        """Start a new epoch; cursors from the previous one get a snapshot."""
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._buffer.clear()
+        self._seq_by_event_id.clear()
+
+    def record(self, data):
+        """Return the sequence number of ``data``, assigning one the first time."""
+        event_id = data.get("event_id")
+        if event_id in self._seq_by_event_id:
+            return self._seq_by_event_id[event_id]
+        self.seq += 1
+        if len(self._buffer) >= self.size:
+            _seq, evicted = self._buffer.popleft()
+            self._seq_by_event_id.pop(evicted.get("event_id"), None)
+        self._buffer.append((self.seq, data))
+        if event_id is not None:
+            self._seq_by_event_id[event_id] = self.seq
+        return self.seq
+
+    def since(self, epoch, seq):
+        """Events after ``seq`` as ``(seq, data)`` pairs, or None if out of range."""
+        if epoch != self.epoch or not 0 <= seq <= self.seq:
+            return None
+        oldest = self._buffer[0][0] if self._buffer else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        return [(event_seq, data) for event_seq, data in self._buffer if event_seq > seq]
+
+    def ensure_following(self, channel_layer):
+        """Make sure a task is recording every event on the ``orders`` group.
+
+        Without it the journal would only see events while some screen
+        subscribed to ``orders`` happened to be connected.
+        """
+        loop = asyncio.get_running_loop()
+        if self._follower is not None and self._loop is loop and not self._follower.done():
+            return
+        if self._follower is not None:
+            self.reset()
+        self._loop = loop
+        self._follower = loop.create_task(self._follow(channel_layer))
+
+    async def _follow(self, channel_layer):
+        loop = asyncio.get_running_loop()
+        channel = await channel_layer.new_channel()
+        refresh_at = loop.time()
+        try:
+            while True:
+                if loop.time() >= refresh_at:
+                    await channel_layer.group_add(events.ORDERS_GROUP, channel)
+                    refresh_at = loop.time() + GROUP_REFRESH_SECONDS
+                try:
+                    message = await asyncio.wait_for(
+                        channel_layer.receive(channel), refresh_at - loop.time()
+                    )
+                except asyncio.TimeoutError:
+                    continue
+                if message.get("type") == events.MESSAGE_TYPE:
+                    self.record(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Order event journal stopped following %s", events.ORDERS_GROUP)
+            self.reset()
+
+
+_journal = None
+
+
+def get_journal():
+    global _journal
+    if _journal is None:
+        size = getattr(settings, "ORDER_STREAM", {}).get("REPLAY_BUFFER", 1000)
+        _journal = EventJournal(size)
+    return _journal
@@ -0,0 +1,177 @@
+"""Publish order lifecycle events to the channel layer.
+
+Kitchen screens subscribe through ``OrderStreamConsumer``. Every order
+creation, status transition or item change is announced once its transaction
+commits, so screens never see an order that was rolled back. Events go to:
+
+* ``orders`` -- everything;
+* ``orders.table.<table_id>`` -- one table's orders;
+* ``orders.status.<status>`` -- orders entering *or* leaving a status, so a
+  "preparing" screen also learns when a ticket moves on;
+* ``orders.order.<order_id>`` -- one order, for the guest's tracking page
+  (``OrderTrackingConsumer``).
+
+Sending is handed to a single background thread (``ORDER_EVENTS["ASYNC"]``)
+so the HTTP request never waits on the channel layer. That thread drains its
+queue in batches and merges events for the same order, which collapses the
+several saves a single admin or API edit can make into one message.
+"""
+
+import logging
+import queue
+import threading
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+ORDERS_GROUP = "orders"
+MESSAGE_TYPE = "order.updated"
+
+CREATED = "created"
+STATUS = "status"
+ITEMS = "items"
+UPDATED = "updated"
+
+
+def table_group(table_id):
+    return f"{ORDERS_GROUP}.table.{table_id}"
+
+
+def status_group(status):
+    return f"{ORDERS_GROUP}.status.{status}"
+
+
+def order_group(order_id):
+    return f"{ORDERS_GROUP}.order.{order_id}"
+
+
+def note_change(order, change):
+    """Tag the next save of ``order`` with ``change`` (e.g. :data:`ITEMS`)."""
+    if not hasattr(order, "_event_changes"):
+        order._event_changes = set()
+    order._event_changes.add(change)
+
+
+def order_payload(order, changes, previous_status=None):
+    table = order.table if type(order).table.is_cached(order) else None
+    payload = {
+        "changes": sorted(changes),
+        "order": {
+            "id": order.pk,
+            "table_id": order.table_id,
+            "table": table.table_number if table is not None else None,
+            "status": order.status,
+            "total_price": str(order.total_price),
+            "updated_at": order.updated_at.isoformat().replace("+00:00", "Z"),
+        },
+    }
+    if previous_status is not None:
+        payload["previous_status"] = previous_status
+    return payload
+
+
+def groups_for(payload):
+    order = payload["order"]
+    groups = [
+        ORDERS_GROUP,
+        table_group(order["table_id"]),
+        status_group(order["status"]),
+        order_group(order["id"]),
+    ]
+    if payload.get("previous_status"):
+        groups.append(status_group(payload["previous_status"]))
+    return groups
+
+
+def publish_order(order, changes, previous_status=None):
+    """Announce ``order`` with ``changes`` after the current transaction commits.
+
+    The payload is built at commit time, so it reflects the order's final
+    state even if it is saved again later in the same transaction.
+    """
+    changes = set(changes)
+
+    def send():
+        _dispatcher.submit(order_payload(order, changes, previous_status))
+
+    transaction.on_commit(send)
+
+
+def merge(earlier, later):
+    """Combine two payloads for the same order, keeping the later state."""
+    merged = dict(later)
+    merged["changes"] = sorted(set(earlier["changes"]) | set(later["changes"]))
+    previous = earlier.get("previous_status")
+    if previous is not None and previous != later["order"]["status"]:
+        merged["previous_status"] = previous
+    elif previous is not None:
+        merged.pop("previous_status", None)
+    return merged
+
+
+def coalesce(payloads):
+    by_order = {}
+    for payload in payloads:
+        order_id = payload["order"]["id"]
+        by_order[order_id] = (
+            merge(by_order[order_id], payload) if order_id in by_order else payload
+        )
+    return list(by_order.values())
+
+
+async def _group_send(layer, payloads):
+    for payload in payloads:
+        payload["event_id"] = uuid.uuid4().hex
+        message = {"type": MESSAGE_TYPE, "data": payload}
+        for group in groups_for(payload):
+            await layer.group_send(group, message)
+
+
+def send_now(payloads):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(_group_send)(layer, payloads)
+    except Exception:
+        logger.exception("Could not publish %d order event(s)", len(payloads))
+
+
+class _Dispatcher:
+    """Single background sender fed from ``transaction.on_commit`` callbacks."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        if not getattr(settings, "ORDER_EVENTS", {}).get("ASYNC", True):
+            send_now([payload])
+            return
+        self._queue.put(payload)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="order-events", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            send_now(coalesce(batch))
+
+
+_dispatcher = _Dispatcher()
@@ -0,0 +1,58 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Order
+
+
+def _parse_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class OrderFilterBackend(BaseFilterBackend):
+    """Filter orders by ``status``, ``table`` and a ``created_after``/``created_before`` range.
+
+    ``status`` and ``table`` accept comma-separated values. Each combination
+    is backed by one of the composite indexes on ``Order``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+
+        if params.get("status"):
+            statuses = params["status"].split(",")
+            valid = {value for value, _label in Order.STATUS_CHOICES}
+            unknown = [status for status in statuses if status not in valid]
+            if unknown:
+                errors["status"] = [f'Unknown status "{status}".' for status in unknown]
+            else:
+                queryset = queryset.filter(status__in=statuses)
+
+        if params.get("table"):
+            try:
+                tables = [int(table) for table in params["table"].split(",")]
+            except ValueError:
+                errors["table"] = ["Expected a comma-separated list of table ids."]
+            else:
+                queryset = queryset.filter(table_id__in=tables)
+
+        ranges = (("created_after", "created_at__gte"), ("created_before", "created_at__lt"))
+        for param, lookup in ranges:
+            if params.get(param):
+                value = _parse_datetime(params[param])
+                if value is None:
+                    errors[param] = ["Expected an ISO 8601 datetime."]
+                else:
+                    queryset = queryset.filter(**{lookup: value})
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
@@ -0,0 +1,225 @@
+"""Per-request query counts and timings.
+
+With ``REQUEST_METRICS["ENABLED"]``, :class:`RequestMetricsMiddleware` records
+for every request:
+
+* the number of SQL queries and the time spent in them, through an execute
+  wrapper on every configured database (:func:`watch_connections`);
+* time spent turning objects into primitives in DRF serializers
+  (:class:`TimedSerializerMixin`);
+* time spent rendering templates (:class:`InstrumentedDjangoTemplates`).
+
+They are returned in a ``Server-Timing`` header, which browser dev tools
+display per request, and logged as one ``key=value`` line on the
+``core.requests`` logger at INFO. Requests slower than ``SLOW_REQUEST_MS`` are
+also logged at WARNING with their slowest queries and the most repeated
+statement, which is how N+1 patterns show up.
+
+The middleware works in sync and async mode, so enabling it leaves async
+views (``core.async_views``) async. When disabled, it removes itself at
+startup (``MiddlewareNotUsed``) and the serializer/template hooks cost one
+context variable lookup each.
+"""
+
+import heapq
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger("core.requests")
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.timings = Counter()
+        self._active = set()
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_ms(self):
+        return sum(duration for duration, _sql in self.queries)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(((time.perf_counter() - start) * 1000, sql))
+
+    @contextmanager
+    def measure(self, kind):
+        """Add the block's duration to ``kind``; nested blocks of a kind count once."""
+        if kind in self._active:
+            yield
+            return
+        self._active.add(kind)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(kind)
+            self.timings[kind] += (time.perf_counter() - start) * 1000
+
+    def slowest_queries(self, count):
+        return heapq.nlargest(count, self.queries, key=lambda query: query[0])
+
+    def most_repeated_query(self):
+        """``(sql, times)`` for the statement run most often, or None."""
+        repeats = Counter(sql for _duration, sql in self.queries).most_common(1)
+        return repeats[0] if repeats else None
+
+    def server_timing(self, total_ms):
+        parts = [f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries"']
+        parts += [f"{kind};dur={ms:.1f}" for kind, ms in sorted(self.timings.items())]
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def watch_connections():
+    """Record this thread's queries into the current request's metrics.
+
+    Connections belong to a thread, and under ASGI a request's queries run
+    on a sync thread of its own, so this runs there. The wrapper stays
+    installed and does nothing outside a measured request.
+    """
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """Sync and async, so enabling it keeps async views off the sync thread."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "REQUEST_METRICS", {})
+        if not config.get("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = config.get("HEADER", True)
+        self.slow_ms = config.get("SLOW_REQUEST_MS", 500)
+        self.worst_queries = config.get("WORST_QUERIES", 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            watch_connections()
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            # The thread the async ORM and any sync views of this request use.
+            await sync_to_async(watch_connections)()
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total_ms = metrics.total_ms()
+        if self.header:
+            response["Server-Timing"] = metrics.server_timing(total_ms)
+        self.log(request, response, metrics, total_ms)
+        return response
+
+    def log(self, request, response, metrics, total_ms):
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(metrics.db_ms, 1),
+            "queries": metrics.query_count,
+            **{f"{kind}_ms": round(ms, 1) for kind, ms in sorted(metrics.timings.items())},
+        }
+        line = " ".join(f"{key}={value}" for key, value in fields.items())
+        logger.info(line, extra={"request_metrics": fields})
+        if total_ms < self.slow_ms:
+            return
+        details = [
+            f"{duration:.1f}ms {sql}"
+            for duration, sql in metrics.slowest_queries(self.worst_queries)
+        ]
+        repeated = metrics.most_repeated_query()
+        if repeated is not None and repeated[1] > 1:
+            details.append(f"repeated x{repeated[1]}: {repeated[0]}")
+        logger.warning(
+            "Slow request %s\n  %s",
+            line,
+            "\n  ".join(details),
+            extra={"request_metrics": fields},
+        )
+
+
+class TimedSerializerMixin:
+    """Count ``to_representation`` time as ``serializer`` in the request metrics."""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        with metrics.measure("serializer"):
+            return super().to_representation(instance)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        with metrics.measure("template"):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,256 @@
+"""Live counters for the home page and the admin dashboard.
+
+The widgets on ``home`` (active tables, open orders) and ``admin_dashboard``
+(tables per status, top dishes) used to run ``COUNT``/``GROUP BY`` queries on
+every hit. They now read integer counters kept by this module:
+
+* ``tables:<status>`` -- tables in each status;
+* ``orders:open`` -- orders that are not closed;
+* ``dish:<menu_item_id>`` -- lines of served/closed orders per menu item, the
+  same figure the dashboard's "popular dishes" ranked by.
+
+The counters are seeded from the database on first use and adjusted by the
+model hooks in ``core.signals`` (and ``core.rollups`` for dishes) after each
+write commits. Whenever they are older than
+``LIVE_STATS["RECONCILE_INTERVAL"]`` seconds the next reader re-seeds them,
+which bounds any drift from writes that bypass signals.
+``manage.py check_live_stats`` reports drift on demand.
+
+Storage is pluggable the same way as ``core.menu_cache``:
+:class:`DjangoCacheBackend` (the default) shares the counters through one of
+Django's ``CACHES``; :class:`LocalMemoryBackend` keeps them per process, so
+each worker only sees its own writes until it reconciles. Management commands
+run in a process of their own and cannot reach per-process counters, so they
+call :func:`require_shared` before reading or resetting them.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import menu_cache
+from .db_router import replica_reads
+from .models import DailyItemSales, Order, Table
+
+SEEDED_AT = "seeded_at"
+OPEN_ORDERS = "orders:open"
+TABLE_STATUSES = [value for value, _label in Table.STATUS_CHOICES]
+
+
+def table_key(status):
+    return f"tables:{status}"
+
+
+def dish_key(menu_item_id):
+    return f"dish:{menu_item_id}"
+
+
+class LocalMemoryBackend:
+    """Keep the counters in this process only."""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get_many(self, keys):
+        values = self._values
+        return {key: values[key] for key in keys if key in values}
+
+    def replace(self, values):
+        with self._lock:
+            self._values = dict(values)
+
+    def incr_many(self, deltas):
+        with self._lock:
+            if self._values.get(SEEDED_AT) is None:
+                return
+            for key, delta in deltas.items():
+                self._values[key] = self._values.get(key, 0) + delta
+
+
+class DjangoCacheBackend:
+    """Keep the counters in a Django cache shared by all workers."""
+
+    prefix = "live:"
+
+    def __init__(self, alias="default", timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def shared(self):
+        return not isinstance(self.cache, (LocMemCache, DummyCache))
+
+    def get_many(self, keys):
+        found = self.cache.get_many([self.prefix + key for key in keys])
+        return {key[len(self.prefix):]: value for key, value in found.items()}
+
+    def replace(self, values):
+        self.cache.set_many(
+            {self.prefix + key: value for key, value in values.items()}, self.timeout
+        )
+
+    def incr_many(self, deltas):
+        if self.cache.get(self.prefix + SEEDED_AT) is None:
+            return
+        for key, delta in deltas.items():
+            try:
+                self.cache.incr(self.prefix + key, delta)
+            except ValueError:
+                self.cache.add(self.prefix + key, delta, self.timeout)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = getattr(settings, "LIVE_STATS", {})
+        backend_class = import_string(
+            config.get("BACKEND", "core.live_stats.DjangoCacheBackend")
+        )
+        _backend = backend_class(**config.get("OPTIONS", {}))
+    return _backend
+
+
+def require_shared():
+    """Raise ``ImproperlyConfigured`` unless other processes see the counters."""
+    backend = get_backend()
+    if not backend.shared:
+        raise ImproperlyConfigured(
+            f"Live counters are kept per process by {type(backend).__name__}, so "
+            "this process cannot see or reset the web workers' counters. Use "
+            "core.live_stats.DjangoCacheBackend with a shared cache such as Redis."
+        )
+
+
+def read_database():
+    """The counters as the database has them right now."""
+    values = {table_key(status): 0 for status in TABLE_STATUSES}
+    for status, count in (
+        Table.objects.values("status")
+        .annotate(count=Count("id"))
+        .values_list("status", "count")
+        .order_by()
+    ):
+        values[table_key(status)] = count
+    values[OPEN_ORDERS] = Order.objects.exclude(status=Order.STATUS_CLOSED).count()
+    values.update({dish_key(item.pk): 0 for item in menu_cache.get_menu().items})
+    for menu_item_id, line_count in (
+        DailyItemSales.objects.values("menu_item_id")
+        .annotate(line_count=Sum("line_count"))
+        .values_list("menu_item_id", "line_count")
+        .order_by()
+    ):
+        values[dish_key(menu_item_id)] = line_count
+    return values
+
+
+def reconcile():
+    """Replace the counters with fresh values from the database."""
+    # From the primary, or the counters would start out as stale as the replica.
+    with replica_reads(False):
+        values = read_database()
+    values[SEEDED_AT] = time.time()
+    get_backend().replace(values)
+    return values
+
+
+def _read(keys):
+    values = get_backend().get_many([SEEDED_AT, *keys])
+    interval = getattr(settings, "LIVE_STATS", {}).get("RECONCILE_INTERVAL", 300)
+    seeded_at = values.get(SEEDED_AT)
+    if seeded_at is None or time.time() - seeded_at > interval:
+        values = reconcile()
+    return values
+
+
+def table_counts():
+    """``{status: count}`` for every table status."""
+    values = _read([table_key(status) for status in TABLE_STATUSES])
+    return {status: values.get(table_key(status), 0) for status in TABLE_STATUSES}
+
+
+def open_orders():
+    return _read([OPEN_ORDERS]).get(OPEN_ORDERS, 0)
+
+
+def top_dishes(k=5):
+    """The ``k`` most ordered menu items as ``(menu_item, times_ordered)`` pairs."""
+    items = menu_cache.get_menu().items
+    values = _read([dish_key(item.pk) for item in items])
+    counts = ((item, values.get(dish_key(item.pk), 0)) for item in items)
+    return heapq.nlargest(k, (pair for pair in counts if pair[1] > 0), key=lambda pair: pair[1])
+
+
+def adjust(deltas):
+    """Apply counter ``deltas`` once the current transaction commits."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: get_backend().incr_many(deltas))
+
+
+def _transition(key_for, previous, current, deltas=None):
+    # None stands for "did not exist" on either side.
+    deltas = Counter() if deltas is None else deltas
+    if previous is not None and key_for(previous):
+        deltas[key_for(previous)] -= 1
+    if current is not None and key_for(current):
+        deltas[key_for(current)] += 1
+    return deltas
+
+
+def table_changed(previous_status, status):
+    adjust(_transition(table_key, previous_status, status))
+
+
+def _open_order_key(status):
+    return OPEN_ORDERS if status != Order.STATUS_CLOSED else None
+
+
+def order_changed(previous_status, status):
+    adjust(_transition(_open_order_key, previous_status, status))
+
+
+def orders_changed(transitions):
+    """:func:`order_changed` for many ``(previous_status, status)`` pairs at once."""
+    deltas = Counter()
+    for previous_status, status in transitions:
+        _transition(_open_order_key, previous_status, status, deltas)
+    adjust(deltas)
+
+
+def dishes_sold(line_counts):
+    """Add ``{menu_item_id: lines}`` (negative to remove) to the dish counters."""
+    adjust({dish_key(menu_item_id): lines for menu_item_id, lines in line_counts.items()})
+
+
+def reset():
+    """Forget the counters; the next reader re-seeds them."""
+    get_backend().replace({SEEDED_AT: None})
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == "LIVE_STATS":
+        _backend = None
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = "Move closed orders older than --days, with their lines, to the archive tables."
+
+    def add_arguments(self, parser):
+        config = getattr(settings, "ORDER_ARCHIVE", {})
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=config.get("AFTER_DAYS", 90),
+            help="Archive orders closed more than this many days ago.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=config.get("CHUNK_SIZE", 1000))
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count the orders that would move."
+        )
+
+    def handle(self, *args, days, chunk_size, dry_run=False, **options):
+        if days < 0 or chunk_size < 1:
+            raise CommandError("--days must be >= 0 and --chunk-size positive.")
+        if dry_run:
+            count = archive.archivable(days).count()
+            self.stdout.write(f"{count} order(s) closed more than {days} day(s) ago.")
+            return
+        moved = archive.archive_orders(
+            days,
+            chunk_size,
+            progress=lambda moved: self.stdout.write(f"Archived {moved} order(s)...", ending="\r"),
+        )
+        if moved:
+            self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} order(s)."))
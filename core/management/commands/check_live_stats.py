@@ -0,0 +1,41 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core import live_stats
+
+
+class Command(BaseCommand):
+    help = "Compare the live dashboard counters with the database and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Re-seed the counters from the database when they have drifted.",
+        )
+
+    def handle(self, *args, fix=False, **options):
+        try:
+            live_stats.require_shared()
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        expected = live_stats.read_database()
+        actual = live_stats.get_backend().get_many([live_stats.SEEDED_AT, *expected])
+        if actual.get(live_stats.SEEDED_AT) is None:
+            self.stdout.write("Live counters are not seeded; the next reader will seed them.")
+            return
+        drift = {
+            key: (actual.get(key, 0), value)
+            for key, value in sorted(expected.items())
+            if actual.get(key, 0) != value
+        }
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f"{len(expected)} counters match the database."))
+            return
+        for key, (live, database) in drift.items():
+            self.stdout.write(f"{key}: live {live}, database {database}")
+        if fix:
+            live_stats.reconcile()
+            self.stdout.write(self.style.SUCCESS(f"Re-seeded after {len(drift)} drifted counter(s)."))
+            return
+        raise CommandError(f"{len(drift)} counter(s) drifted; rerun with --fix to re-seed.")
@@ -0,0 +1,245 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import conditional, live_stats, menu_cache, rollups
+from core.models import Category, MenuItem, Order, OrderItem, Table
+
+# Relative order volume per hour of the day: lunch and dinner peaks.
+HOUR_WEIGHTS = [
+    0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 3, 5,
+    12, 14, 10, 4, 3, 4, 7, 13, 15, 12, 6, 2,
+]
+# Friday to Sunday are busier (weekday() numbering).
+WEEKDAY_WEIGHTS = [0.8, 0.8, 0.9, 0.9, 1.2, 1.5, 1.4]
+LINE_WEIGHTS = {1: 20, 2: 30, 3: 25, 4: 15, 5: 7, 6: 3}
+QUANTITY_WEIGHTS = {1: 70, 2: 20, 3: 7, 4: 3}
+CAPACITIES = [2, 2, 4, 4, 4, 6, 8]
+DIET_WEIGHTS = {MenuItem.DIET_VEG: 70, MenuItem.DIET_EGG: 10, MenuItem.DIET_NON_VEG: 20}
+# Orders younger than this are still moving through the kitchen.
+OPEN_ORDER_AGE = timedelta(hours=3)
+
+
+@contextmanager
+def fixed_timestamps(model, *field_names):
+    """Let bulk_create keep explicit values for auto_now/auto_now_add fields."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Append synthetic tables, menu items and orders for scale testing. "
+        "Output is deterministic for a given --seed and --until."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--menu-items", type=int, default=300)
+        parser.add_argument("--orders", type=int, default=100_000)
+        parser.add_argument(
+            "--days", type=int, default=180, help="Spread orders over this many days."
+        )
+        parser.add_argument(
+            "--until", help="Last day of generated orders (YYYY-MM-DD); default is today."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if options["until"]:
+            try:
+                until = parse_date(options["until"])
+            except ValueError:
+                until = None
+            if until is None:
+                raise CommandError(f"Invalid --until date: {options['until']!r}")
+        else:
+            until = timezone.localdate()
+        if options["days"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--days and --chunk-size must be positive.")
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.make_aware(datetime.combine(until, dt_time(23, 59)))
+        started = time.perf_counter()
+
+        tables = self.create_tables(options["tables"])
+        menu = self.create_menu(options["categories"], options["menu_items"])
+        if not tables:
+            tables = list(Table.objects.order_by("pk"))
+        if not menu:
+            menu = list(MenuItem.objects.order_by("pk"))
+        if options["orders"] and not (tables and menu):
+            raise CommandError("Orders need at least one table and one menu item.")
+
+        self.create_orders(options["orders"], options["days"], options["chunk_size"], tables, menu)
+
+        # bulk_create skips the signals that maintain these.
+        self.stdout.write("Rebuilding rollups...")
+        rollups.rebuild()
+        menu_cache.invalidate()
+        conditional.bump(conditional.MENU, conditional.TABLE)
+        self.stdout.write(
+            self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s.")
+        )
+        try:
+            live_stats.require_shared()
+        except ImproperlyConfigured as exc:
+            raise CommandError(f"Live counters were not reset: {exc}")
+        live_stats.reset()
+
+    def create_tables(self, count):
+        if not count:
+            return []
+        start = (Table.objects.aggregate(last=Max("table_number"))["last"] or 0) + 1
+        with transaction.atomic():
+            tables = Table.objects.bulk_create(
+                (
+                    Table(table_number=start + i, capacity=self.rng.choice(CAPACITIES))
+                    for i in range(count)
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write(f"Created {len(tables)} tables.")
+        return tables
+
+    def create_menu(self, categories, items):
+        if not items:
+            return []
+        with transaction.atomic():
+            start = Category.objects.count() + 1
+            new_categories = Category.objects.bulk_create(
+                Category(name=f"Category {start + i}") for i in range(max(1, categories))
+            )
+            diets, diet_weights = zip(*DIET_WEIGHTS.items())
+            menu = MenuItem.objects.bulk_create(
+                (
+                    MenuItem(
+                        name=f"{new_categories[i % len(new_categories)].name} dish {i + 1}",
+                        description=f"Generated dish {i + 1}",
+                        price=Decimal(self.rng.randrange(160, 1200)) / 2,
+                        category=new_categories[i % len(new_categories)],
+                        diet=self.rng.choices(diets, diet_weights)[0],
+                    )
+                    for i in range(items)
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write(f"Created {len(new_categories)} categories and {len(menu)} menu items.")
+        return menu
+
+    def create_orders(self, count, days, chunk_size, tables, menu):
+        rng = self.rng
+        # A few dishes sell far more than the rest (Zipf-like).
+        popularity = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(menu))))
+        ranked_menu = rng.sample(menu, len(menu))
+        first_day = self.now.date() - timedelta(days=days - 1)
+        day_list = [first_day + timedelta(days=offset) for offset in range(days)]
+        day_weights = list(accumulate(WEEKDAY_WEIGHTS[day.weekday()] for day in day_list))
+        hours, hour_weights = list(range(24)), list(accumulate(HOUR_WEIGHTS))
+        line_counts, line_weights = zip(*LINE_WEIGHTS.items())
+        quantities, quantity_weights = zip(*QUANTITY_WEIGHTS.items())
+        line_weights = list(accumulate(line_weights))
+        quantity_weights = list(accumulate(quantity_weights))
+        tz = timezone.get_current_timezone()
+
+        created = 0
+        started = time.perf_counter()
+        with fixed_timestamps(Order, "created_at", "updated_at"):
+            while created < count:
+                size = min(chunk_size, count - created)
+                orders, order_lines = [], []
+                for _ in range(size):
+                    day = rng.choices(day_list, cum_weights=day_weights)[0]
+                    hour = rng.choices(hours, cum_weights=hour_weights)[0]
+                    created_at = datetime.combine(
+                        day, dt_time(hour, rng.randrange(60), rng.randrange(60)), tz
+                    )
+                    if created_at > self.now:
+                        created_at -= timedelta(days=1)
+                    lines = [
+                        (
+                            rng.choices(ranked_menu, cum_weights=popularity)[0],
+                            rng.choices(quantities, cum_weights=quantity_weights)[0],
+                        )
+                        for _ in range(rng.choices(line_counts, cum_weights=line_weights)[0])
+                    ]
+                    total = sum((item.price * quantity for item, quantity in lines), Decimal(0))
+                    status, updated_at = self.order_progress(created_at)
+                    orders.append(
+                        Order(
+                            table=rng.choice(tables),
+                            status=status,
+                            total_price=total,
+                            created_at=created_at,
+                            updated_at=updated_at,
+                        )
+                    )
+                    order_lines.append(lines)
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders)
+                    OrderItem.objects.bulk_create(
+                        OrderItem(
+                            order=order,
+                            menu_item=item,
+                            quantity=quantity,
+                            line_total=item.price * quantity,
+                        )
+                        for order, lines in zip(orders, order_lines)
+                        for item, quantity in lines
+                    )
+                created += size
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Orders {created}/{count} ({created / elapsed:,.0f}/s)", ending="\r"
+                )
+        if count:
+            self.stdout.write("")
+        self.mark_occupied_tables()
+
+    def order_progress(self, created_at):
+        """Status and last update for an order placed at ``created_at``."""
+        rng = self.rng
+        age = self.now - created_at
+        if age > OPEN_ORDER_AGE:
+            status = Order.STATUS_CLOSED if rng.random() < 0.97 else Order.STATUS_SERVED
+            return status, created_at + timedelta(minutes=rng.randint(30, 120))
+        # Still in the kitchen: further along the older it is.
+        stage = min(int(age / OPEN_ORDER_AGE * 4 + rng.random()), 3)
+        status = [
+            Order.STATUS_RECEIVED,
+            Order.STATUS_PREPARING,
+            Order.STATUS_READY,
+            Order.STATUS_SERVED,
+        ][stage]
+        return status, min(self.now, created_at + timedelta(minutes=10 * stage))
+
+    def mark_occupied_tables(self):
+        open_orders = Order.objects.exclude(status=Order.STATUS_CLOSED)
+        # The session opens with the table's first open order, as in the API.
+        first_open_order = (
+            open_orders.filter(table=OuterRef("pk"))
+            .values("table")
+            .annotate(first=Min("created_at"))
+            .values("first")
+        )
+        Table.objects.filter(
+            pk__in=open_orders.values("table_id"), status=Table.STATUS_AVAILABLE
+        ).update(status=Table.STATUS_OCCUPIED, opened_at=Subquery(first_open_order))
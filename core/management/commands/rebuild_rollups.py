@@ -0,0 +1,33 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core import live_stats, rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily revenue and item-sales rollups from the orders table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only rebuild days on or after this date (YYYY-MM-DD); default is all days.",
+        )
+
+    def handle(self, *args, since=None, **options):
+        if since is not None:
+            try:
+                day = parse_date(since)
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError(f"Invalid --since date: {since!r}")
+            since = day
+        days = rollups.rebuild(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {days} day(s)."))
+        # Dish counters are seeded from the rollups.
+        try:
+            live_stats.require_shared()
+        except ImproperlyConfigured as exc:
+            raise CommandError(f"Live counters were not reset: {exc}")
+        live_stats.reset()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Recreate the menu search index (and its SQLite triggers) and reindex every item."
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            search.install(schema_editor)
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt for {connection.vendor}."))
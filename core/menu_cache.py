@@ -0,0 +1,201 @@
+"""Versioned menu snapshot shared by the public pages and the menu API.
+
+Every QR-code scan used to re-query ``MenuItem`` and ``Category`` even though
+the menu only changes a few times a day. Instead, readers call
+:func:`get_menu`, which returns an immutable :class:`MenuSnapshot` for the
+current menu version. Any save or delete of a menu row bumps the version (see
+``core.signals``) and the next reader rebuilds the snapshot lazily.
+
+Where snapshots and the version number live is pluggable through
+``settings.MENU_CACHE``:
+
+* :class:`LocalMemoryBackend` keeps both in the worker process. Other workers
+  only notice a change once their snapshot is older than ``timeout`` seconds.
+* :class:`DjangoCacheBackend` stores them in one of Django's ``CACHES`` so that
+  every worker sharing that cache sees a bump immediately.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import conditional
+from .db_router import replica_reads
+from .models import Category, MenuItem
+
+
+class MenuSnapshot:
+    """All categories and menu items as of ``version``, ordered by name.
+
+    ``stamp`` is the ``conditional.MENU`` change counter read just before the
+    rows, so ETags derived from it always describe this snapshot's content.
+    """
+
+    def __init__(self, version, categories, items, stamp=None):
+        self.version = version
+        self.stamp = stamp
+        self.built_at = time.time()
+        self.categories = tuple(categories)
+        self.items = tuple(items)
+        self.available_items = tuple(item for item in self.items if item.is_available)
+        self.veg_items = tuple(
+            item for item in self.available_items if item.diet == MenuItem.DIET_VEG
+        )
+        self._items_by_id = {item.pk: item for item in self.items}
+
+    def get_item(self, pk):
+        return self._items_by_id.get(pk)
+
+    @classmethod
+    def build(cls, version):
+        # From the primary: a lagging replica would cache the old menu.
+        with replica_reads(False):
+            stamp = conditional.counter_stamp(conditional.MENU)
+            categories = list(Category.objects.order_by("name"))
+            items = list(
+                MenuItem.objects.select_related("category")
+                .prefetch_related("tags")
+                .order_by("name")
+            )
+        return cls(version, categories, items, stamp)
+
+
+class LocalMemoryBackend:
+    """Keep the version and the latest snapshot in this process only."""
+
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._version = 1
+        self._snapshot = None
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def get_snapshot(self, version):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            return None
+        if self.timeout is not None and time.time() - snapshot.built_at > self.timeout:
+            return None
+        return snapshot
+
+    def set_snapshot(self, snapshot):
+        with self._lock:
+            if snapshot.version == self._version:
+                self._snapshot = snapshot
+
+
+class DjangoCacheBackend:
+    """Keep the version and snapshots in a Django cache shared by all workers."""
+
+    version_key = "menu:version"
+
+    def __init__(self, alias="default", timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            # Seed with the clock so a flushed cache never reuses an old version.
+            self.cache.add(self.version_key, time.time_ns(), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def bump_version(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.add(self.version_key, time.time_ns(), None)
+
+    def get_snapshot(self, version):
+        return self.cache.get(f"menu:snapshot:{version}")
+
+    def set_snapshot(self, snapshot):
+        self.cache.set(f"menu:snapshot:{snapshot.version}", snapshot, self.timeout)
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_backend = None
+_stats = _Stats()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = getattr(settings, "MENU_CACHE", {})
+        backend_class = import_string(
+            config.get("BACKEND", "core.menu_cache.LocalMemoryBackend")
+        )
+        _backend = backend_class(**config.get("OPTIONS", {}))
+    return _backend
+
+
+def get_menu():
+    """Return the snapshot for the current menu version, rebuilding if needed."""
+    backend = get_backend()
+    version = backend.get_version()
+    snapshot = backend.get_snapshot(version)
+    _stats.record(hit=snapshot is not None)
+    if snapshot is None:
+        snapshot = MenuSnapshot.build(version)
+        backend.set_snapshot(snapshot)
+    return snapshot
+
+
+def invalidate():
+    """Bump the menu version so the next reader rebuilds the snapshot."""
+    get_backend().bump_version()
+
+
+def stats():
+    """Hit and miss counters for this process."""
+    return _stats.as_dict()
+
+
+def reset_stats():
+    global _stats
+    _stats = _Stats()
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == "MENU_CACHE":
+        _backend = None
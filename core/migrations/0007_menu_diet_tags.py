@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:26
+
+import re
+
+from django.db import migrations, models
+
+# What menu_page/order_page used to filter on, as whole words.
+NON_VEG_WORDS = re.compile(r"\b(chicken|mutton|lamb|fish|prawns?|keema)\b", re.IGNORECASE)
+EGG_WORDS = re.compile(r"\b(egg|eggs|omelette)\b", re.IGNORECASE)
+
+
+def classify_diet(apps, schema_editor):
+    MenuItem = apps.get_model("core", "MenuItem")
+    by_diet = {"non_veg": [], "egg": []}
+    for pk, name in MenuItem.objects.values_list("pk", "name"):
+        if NON_VEG_WORDS.search(name):
+            by_diet["non_veg"].append(pk)
+        elif EGG_WORDS.search(name):
+            by_diet["egg"].append(pk)
+    for diet, pks in by_diet.items():
+        MenuItem.objects.filter(pk__in=pks).update(diet=diet)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='diet',
+            field=models.CharField(choices=[('veg', 'Vegetarian'), ('egg', 'Contains egg'), ('non_veg', 'Non-vegetarian')], db_index=True, default='veg', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='menu_items', to='core.tag'),
+        ),
+        migrations.RunPython(classify_diet, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than imported from core.search, so later edits
+# to that module cannot change what this migration did. Keep the two in step
+# when the index changes: core.search repairs it (rebuild_search_index) and
+# checks its triggers are still there.
+
+
+class RunSQLFor(migrations.RunSQL):
+    """``RunSQL`` that only runs on databases of one ``vendor``."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_menu_diet_tags"),
+    ]
+
+    operations = [
+        RunSQLFor(
+            "sqlite",
+            sql=[
+                """CREATE VIRTUAL TABLE IF NOT EXISTS core_menuitem_fts USING fts5(
+                    name, description, content='core_menuitem', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )""",
+                """CREATE TRIGGER IF NOT EXISTS core_menuitem_fts_ai AFTER INSERT ON core_menuitem BEGIN
+                    INSERT INTO core_menuitem_fts(rowid, name, description)
+                    VALUES (new.id, new.name, new.description);
+                END""",
+                """CREATE TRIGGER IF NOT EXISTS core_menuitem_fts_ad AFTER DELETE ON core_menuitem BEGIN
+                    INSERT INTO core_menuitem_fts(core_menuitem_fts, rowid, name, description)
+                    VALUES ('delete', old.id, old.name, old.description);
+                END""",
+                """CREATE TRIGGER IF NOT EXISTS core_menuitem_fts_au AFTER UPDATE OF name, description
+                ON core_menuitem BEGIN
+                    INSERT INTO core_menuitem_fts(core_menuitem_fts, rowid, name, description)
+                    VALUES ('delete', old.id, old.name, old.description);
+                    INSERT INTO core_menuitem_fts(rowid, name, description)
+                    VALUES (new.id, new.name, new.description);
+                END""",
+                "INSERT INTO core_menuitem_fts(core_menuitem_fts) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS core_menuitem_fts_ai",
+                "DROP TRIGGER IF EXISTS core_menuitem_fts_ad",
+                "DROP TRIGGER IF EXISTS core_menuitem_fts_au",
+                "DROP TABLE IF EXISTS core_menuitem_fts",
+            ],
+        ),
+        RunSQLFor(
+            "postgresql",
+            sql=[
+                "CREATE INDEX IF NOT EXISTS core_menuitem_search_idx ON core_menuitem"
+                " USING GIN (to_tsvector('simple', name || ' ' || description))",
+            ],
+            reverse_sql=["DROP INDEX IF EXISTS core_menuitem_search_idx"],
+        ),
+    ]
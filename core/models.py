@@ -23,6 +23,13 @@ class Table(models.Model):
 	opened_at = models.DateTimeField(null=True, blank=True)
 	closed_at = models.DateTimeField(null=True, blank=True)
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember the stored status so post_save handlers can spot transitions.
+		instance._loaded_status = instance.__dict__.get("status")
+		return instance
+
 	def __str__(self) -> str:  # type: ignore[override]
 		return f"Table {self.table_number} ({self.get_status_display()})"
 
@@ -34,13 +41,35 @@ class Category(models.Model):
 		return self.name
 
 
+class Tag(models.Model):
+	"""Free-form menu label such as "spicy" or "jain", filterable via ``?tag=<slug>``."""
+
+	name = models.CharField(max_length=50, unique=True)
+	slug = models.SlugField(max_length=50, unique=True)
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return self.name
+
+
 class MenuItem(models.Model):
+	DIET_VEG = "veg"
+	DIET_EGG = "egg"
+	DIET_NON_VEG = "non_veg"
+
+	DIET_CHOICES = [
+		(DIET_VEG, "Vegetarian"),
+		(DIET_EGG, "Contains egg"),
+		(DIET_NON_VEG, "Non-vegetarian"),
+	]
+
 	name = models.CharField(max_length=200)
 	description = models.TextField(blank=True)
 	price = models.DecimalField(max_digits=8, decimal_places=2)
 	category = models.ForeignKey(Category, related_name="items", on_delete=models.CASCADE)
 	is_available = models.BooleanField(default=True)
 	image = models.ImageField(upload_to="menu_items/", blank=True, null=True)
+	diet = models.CharField(max_length=10, choices=DIET_CHOICES, default=DIET_VEG, db_index=True)
+	tags = models.ManyToManyField(Tag, related_name="menu_items", blank=True)
 
 	def __str__(self) -> str:  # type: ignore[override]
 		return self.name
@@ -75,6 +104,21 @@ class Order(models.Model):
 		blank=True,
 	)
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember the stored status so post_save handlers can spot transitions.
+		instance._loaded_status = instance.__dict__.get("status")
+		return instance
+
+	class Meta:
+		# Keyset pagination and the list filters in core.filters walk these.
+		indexes = [
+			models.Index(fields=["created_at", "id"], name="order_created_idx"),
+			models.Index(fields=["status", "created_at", "id"], name="order_status_created_idx"),
+			models.Index(fields=["table", "created_at", "id"], name="order_table_created_idx"),
+		]
+
 	def __str__(self) -> str:  # type: ignore[override]
 		return f"Order {self.pk} - Table {self.table.table_number}"
 
@@ -94,6 +138,96 @@ class OrderItem(models.Model):
 		return f"{self.quantity} x {self.menu_item.name}"
 
 
+class ArchivedOrder(models.Model):
+	"""A closed order moved out of ``Order`` by ``core.archive``, keeping its id.
+
+	Only closed orders are archived, so there is no status column.
+	"""
+
+	id = models.BigIntegerField(primary_key=True)
+	table = models.ForeignKey(Table, related_name="archived_orders", on_delete=models.PROTECT)
+	total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+	created_at = models.DateTimeField(db_index=True)
+	closed_at = models.DateTimeField()
+	special_instructions = models.TextField(blank=True)
+	served_by = models.ForeignKey(
+		User,
+		related_name="archived_orders",
+		on_delete=models.SET_NULL,
+		null=True,
+		blank=True,
+	)
+	archived_at = models.DateTimeField(auto_now_add=True)
+
+	status = Order.STATUS_CLOSED
+
+	def get_status_display(self):
+		return dict(Order.STATUS_CHOICES)[self.status]
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return f"Archived order {self.pk} - Table {self.table.table_number}"
+
+
+class ArchivedOrderItem(models.Model):
+	order = models.ForeignKey(ArchivedOrder, related_name="items", on_delete=models.CASCADE)
+	menu_item = models.ForeignKey(
+		MenuItem, related_name="archived_order_items", on_delete=models.PROTECT
+	)
+	quantity = models.PositiveIntegerField(default=1)
+	custom_notes = models.TextField(blank=True)
+	line_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return f"{self.quantity} x {self.menu_item.name}"
+
+
+class ChangeCounter(models.Model):
+	"""Monotonic per-model version used to answer conditional GETs cheaply.
+
+	Bumped in the same transaction as the change it records; see
+	``core.conditional``.
+	"""
+
+	name = models.CharField(max_length=50, unique=True)
+	value = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return f"{self.name} v{self.value}"
+
+
+class DailyRevenue(models.Model):
+	"""Served and closed orders per day of ``Order.created_at``.
+
+	Maintained incrementally by ``core.rollups``; ``rebuild_rollups`` recomputes
+	it from the orders table.
+	"""
+
+	date = models.DateField(unique=True)
+	order_count = models.IntegerField(default=0)
+	revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return f"{self.date}: {self.revenue}"
+
+
+class DailyItemSales(models.Model):
+	"""Order lines (and units) per menu item per day, for served and closed orders."""
+
+	date = models.DateField()
+	menu_item = models.ForeignKey(MenuItem, related_name="daily_sales", on_delete=models.CASCADE)
+	line_count = models.IntegerField(default=0)
+	quantity = models.IntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=["date", "menu_item"], name="daily_item_sales_unique"),
+		]
+
+	def __str__(self) -> str:  # type: ignore[override]
+		return f"{self.date}: {self.quantity} x {self.menu_item_id}"
+
+
 class StaffProfile(models.Model):
 	ROLE_ADMIN = "admin"
 	ROLE_KITCHEN = "kitchen"
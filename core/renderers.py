@@ -0,0 +1,55 @@
+"""MessagePack rendering for the API and the KDS stream.
+
+Order and menu payloads are mostly repeated keys and decimal strings; as
+MessagePack they are smaller and cheaper to encode than JSON. Clients opt in
+with ``Accept: application/msgpack`` (or ``?format=msgpack``). Values msgpack
+has no type for are converted the same way DRF's JSON encoder converts them,
+so both formats carry identical data.
+"""
+
+import json
+
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+def packb(data):
+    return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return packb(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets ``core.export`` negotiate NDJSON; the export streams its own body.
+
+    ``OrderViewSet.handle_exception`` sends the export's errors as JSON, so
+    this only renders a stray response, as a single JSON line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data, cls=JSONEncoder).encode() + b"\n"
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = "text/csv"
+    format = "csv"
@@ -0,0 +1,239 @@
+"""Daily revenue and item-sales rollups for the admin dashboard.
+
+An order counts once it reaches ``served`` or ``closed``. Instead of summing
+every such order on each dashboard load, :func:`record_transition` adds the
+order to ``DailyRevenue`` / ``DailyItemSales`` when it enters one of those
+statuses (and takes it out again if it leaves them or is deleted). Days are
+the local date of ``Order.created_at``, computed the same way here and in
+:func:`rebuild` (``TruncDate`` in the current time zone), so the incremental
+and rebuilt figures agree on SQLite and PostgreSQL alike.
+
+The transition is claimed with a conditional UPDATE before the order is saved
+(``signals.claim_status_transition``), so concurrent saves count it once.
+Queryset ``update(status=...)`` sends no signals and is never counted: bulk
+status changes must do this bookkeeping themselves, as
+``billing.close_session`` does with :func:`apply_many`.
+
+Edits to the lines of an order that has already been counted are not
+tracked; ``manage.py rebuild_rollups`` recomputes any affected days, from
+both live and archived orders (``core.archive``).
+"""
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import live_stats
+from .models import DailyItemSales, DailyRevenue, Order, OrderItem
+
+REVENUE_STATUSES = frozenset({Order.STATUS_SERVED, Order.STATUS_CLOSED})
+
+
+def _increment(model, lookup, **deltas):
+    """Add ``deltas`` to the row matching ``lookup``, creating it if needed."""
+    values = {name: F(name) + delta for name, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently; the row exists now.
+        model.objects.filter(**lookup).update(**values)
+
+
+def _increment_many(model, key_fields, deltas):
+    """:func:`_increment` for many rows in a fixed number of queries.
+
+    ``deltas`` maps key tuples (values of ``key_fields``) to ``{field: delta}``
+    dicts, all with the same fields.
+    """
+    if not deltas:
+        return
+    keys = list(deltas)
+    candidates = model.objects.filter(
+        **{f"{name}__in": {key[i] for key in keys} for i, name in enumerate(key_fields)}
+    )
+    existing = {tuple(getattr(row, name) for name in key_fields): row for row in candidates}
+    updated = []
+    for key, row in existing.items():
+        if key not in deltas:
+            continue
+        for field, delta in deltas[key].items():
+            setattr(row, field, F(field) + delta)
+        updated.append(row)
+    if updated:
+        model.objects.bulk_update(updated, list(deltas[keys[0]]))
+    missing = [key for key in keys if key not in existing]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                model(**dict(zip(key_fields, key)), **deltas[key]) for key in missing
+            )
+    except IntegrityError:
+        # Some were created concurrently; fall back to one row at a time.
+        for key in missing:
+            _increment(model, dict(zip(key_fields, key)), **deltas[key])
+
+
+def apply_many(revenue, sales):
+    """Add many orders to the rollups at once, e.g. when a table session closes.
+
+    ``revenue`` maps days to ``(order_count, revenue)`` and ``sales`` maps
+    ``(day, menu_item_id)`` to ``(line_count, quantity)``. Runs the same
+    number of queries however many orders and lines there are.
+    """
+    _increment_many(
+        DailyRevenue,
+        ("date",),
+        {
+            (day,): {"order_count": order_count, "revenue": amount}
+            for day, (order_count, amount) in revenue.items()
+        },
+    )
+    _increment_many(
+        DailyItemSales,
+        ("date", "menu_item_id"),
+        {
+            key: {"line_count": line_count, "quantity": quantity}
+            for key, (line_count, quantity) in sales.items()
+        },
+    )
+    sold = defaultdict(int)
+    for (_day, menu_item_id), (line_count, _quantity) in sales.items():
+        sold[menu_item_id] += line_count
+    live_stats.dishes_sold(sold)
+
+
+def apply_order(order_id, day, total_price, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one order from the rollups."""
+    _increment(DailyRevenue, {"date": day}, order_count=sign, revenue=sign * total_price)
+    lines = (
+        OrderItem.objects.filter(order_id=order_id)
+        .values("menu_item_id")
+        .annotate(line_count=Count("id"), quantity=Sum("quantity"))
+        .order_by()
+    )
+    sold = {}
+    for line in lines:
+        _increment(
+            DailyItemSales,
+            {"date": day, "menu_item_id": line["menu_item_id"]},
+            line_count=sign * line["line_count"],
+            quantity=sign * line["quantity"],
+        )
+        sold[line["menu_item_id"]] = sign * line["line_count"]
+    live_stats.dishes_sold(sold)
+
+
+def record_transition(order, previous_status):
+    """Update the rollups if ``order`` entered or left a revenue status.
+
+    ``previous_status`` is None for a new order. The update runs after the
+    current transaction commits, when the order's lines are in place and its
+    total is final.
+    """
+    was_counted = previous_status in REVENUE_STATUSES
+    is_counted = order.status in REVENUE_STATUSES
+    if was_counted == is_counted:
+        return
+    sign = 1 if is_counted else -1
+    order_id, day = order.pk, timezone.localdate(order.created_at)
+
+    def apply():
+        with transaction.atomic():
+            apply_order(order_id, day, order.total_price, sign)
+
+    transaction.on_commit(apply)
+
+
+def discard_order(order):
+    """Take a counted order out of the rollups; call before its lines are deleted."""
+    if getattr(order, "_loaded_status", order.status) in REVENUE_STATUSES:
+        apply_order(order.pk, timezone.localdate(order.created_at), order.total_price, -1)
+
+
+def rebuild(since=None, apps=global_apps):
+    """Recompute the rollups from live and archived orders, for days >= ``since``.
+
+    Returns the number of ``DailyRevenue`` rows written. ``apps`` lets data
+    migrations run this against historical models.
+    """
+    revenue_model = apps.get_model("core", "DailyRevenue")
+    sales_model = apps.get_model("core", "DailyItemSales")
+    # (orders, lines) that count; every archived order is closed.
+    sources = [
+        (
+            apps.get_model("core", "Order").objects.filter(status__in=REVENUE_STATUSES),
+            apps.get_model("core", "OrderItem").objects.filter(
+                order__status__in=REVENUE_STATUSES
+            ),
+        )
+    ]
+    try:
+        sources.append(
+            (
+                apps.get_model("core", "ArchivedOrder").objects.all(),
+                apps.get_model("core", "ArchivedOrderItem").objects.all(),
+            )
+        )
+    except LookupError:
+        pass  # Migrations from before the archive existed.
+    revenue_rows = revenue_model.objects.all()
+    sales_rows = sales_model.objects.all()
+    if since is not None:
+        revenue_rows = revenue_rows.filter(date__gte=since)
+        sales_rows = sales_rows.filter(date__gte=since)
+
+    days = defaultdict(lambda: [0, 0])
+    item_days = defaultdict(lambda: [0, 0])
+    for orders, lines in sources:
+        if since is not None:
+            orders = orders.filter(created_at__date__gte=since)
+            lines = lines.filter(order__created_at__date__gte=since)
+        for row in (
+            orders.annotate(day=TruncDate("created_at"))
+            .values("day")
+            .annotate(order_count=Count("id"), revenue=Sum("total_price"))
+            .order_by()
+        ):
+            totals = days[row["day"]]
+            totals[0] += row["order_count"]
+            totals[1] += row["revenue"]
+        for row in (
+            lines.annotate(day=TruncDate("order__created_at"))
+            .values("day", "menu_item_id")
+            .annotate(line_count=Count("id"), quantity=Sum("quantity"))
+            .order_by()
+        ):
+            totals = item_days[row["day"], row["menu_item_id"]]
+            totals[0] += row["line_count"]
+            totals[1] += row["quantity"]
+
+    with transaction.atomic():
+        revenue_rows.delete()
+        sales_rows.delete()
+        written = revenue_model.objects.bulk_create(
+            (
+                revenue_model(date=day, order_count=order_count, revenue=revenue)
+                for day, (order_count, revenue) in days.items()
+            ),
+            batch_size=500,
+        )
+        sales_model.objects.bulk_create(
+            (
+                sales_model(
+                    date=day,
+                    menu_item_id=menu_item_id,
+                    line_count=line_count,
+                    quantity=quantity,
+                )
+                for (day, menu_item_id), (line_count, quantity) in item_days.items()
+            ),
+            batch_size=500,
+        )
+    return len(written)
@@ -5,4 +5,6 @@ from . import ws_consumers
 websocket_urlpatterns = [
     # To be used for KDS and live order/table updates
     path("ws/orders/", ws_consumers.OrderStreamConsumer.as_asgi()),
+    # A guest's tracking page: one order's status changes
+    path("ws/orders/<int:order_id>/", ws_consumers.OrderTrackingConsumer.as_asgi()),
 ]
@@ -0,0 +1,142 @@
+"""Full-text search over menu item names and descriptions.
+
+Each database gets its native index, created by migration ``0008_menu_search``:
+
+* SQLite: an external-content FTS5 table, ``core_menuitem_fts``, kept in step
+  with ``core_menuitem`` by triggers. Migrations that remake ``core_menuitem``
+  on SQLite (most ``AlterField``/``AddField`` operations) drop those triggers;
+  the ``core.W001`` check (run by ``migrate`` and ``check --database``)
+  reports them missing, and ``manage.py rebuild_search_index`` recreates them
+  and reindexes.
+* PostgreSQL: a GIN index over ``to_tsvector('simple', name || ' ' ||
+  description)``, matched by the same expression at query time.
+
+Other engines fall back to ``icontains``. Every word of the query must match,
+as a prefix, so "pan tik" finds "Paneer Tikka".
+"""
+
+import re
+
+from django.core import checks
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import MenuItem
+
+FTS_TABLE = "core_menuitem_fts"
+PG_INDEX = "core_menuitem_search_idx"
+PG_DOCUMENT = "to_tsvector('simple', name || ' ' || description)"
+
+SQLITE_TRIGGERS = [f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"]
+
+_WORD = re.compile(r"\w+")
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='core_menuitem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON core_menuitem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON core_menuitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description
+    ON core_menuitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    *(f"DROP TRIGGER IF EXISTS {trigger}" for trigger in SQLITE_TRIGGERS),
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_INSTALL = [
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON core_menuitem USING GIN ({PG_DOCUMENT})",
+]
+POSTGRES_UNINSTALL = [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+
+
+def _statements(vendor, install=True):
+    if vendor == "sqlite":
+        return SQLITE_INSTALL if install else SQLITE_UNINSTALL
+    if vendor == "postgresql":
+        return POSTGRES_INSTALL if install else POSTGRES_UNINSTALL
+    return []
+
+
+def install(schema_editor):
+    """Create (or repair) the search index for ``schema_editor``'s database."""
+    for statement in _statements(schema_editor.connection.vendor):
+        schema_editor.execute(statement)
+
+
+def uninstall(schema_editor):
+    for statement in _statements(schema_editor.connection.vendor, install=False):
+        schema_editor.execute(statement)
+
+
+def check_triggers(app_configs=None, databases=None, **kwargs):
+    """Warn about SQLite databases whose index has lost its triggers."""
+    problems = []
+    for alias in databases or []:
+        database = connections[alias]
+        if database.vendor != "sqlite":
+            continue
+        with database.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                [FTS_TABLE, *SQLITE_TRIGGERS],
+            )
+            found = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in found:
+            # Not migrated that far yet.
+            continue
+        missing = [trigger for trigger in SQLITE_TRIGGERS if trigger not in found]
+        if missing:
+            problems.append(
+                checks.Warning(
+                    f"Database {alias!r} is missing the menu search triggers "
+                    f"{', '.join(missing)}, so search results go stale.",
+                    hint="Run manage.py rebuild_search_index.",
+                    id="core.W001",
+                )
+            )
+    return problems
+
+
+def words(query):
+    return _WORD.findall(query.lower())
+
+
+def menu_item_ids(query, limit=50):
+    """Ids of menu items matching every word of ``query``, best match first."""
+    terms = words(query)
+    if not terms:
+        return []
+    if connection.vendor == "sqlite":
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s"
+        )
+        params = [" ".join(f'"{term}"*' for term in terms), limit]
+    elif connection.vendor == "postgresql":
+        sql = (
+            f"SELECT id FROM core_menuitem, to_tsquery('simple', %s) query"
+            f" WHERE {PG_DOCUMENT} @@ query"
+            f" ORDER BY ts_rank({PG_DOCUMENT}, query) DESC, name LIMIT %s"
+        )
+        params = [" & ".join(f"{term}:*" for term in terms), limit]
+    else:
+        queryset = MenuItem.objects.order_by("name")
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return list(queryset.values_list("pk", flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
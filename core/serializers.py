@@ -1,9 +1,66 @@
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
-from .models import Category, MenuItem, Order, OrderItem, Table
+from . import events, signals
+from .instrumentation import TimedSerializerMixin
+from .models import Category, MenuItem, Order, OrderItem, Table, Tag
 
 
-class TableSerializer(serializers.ModelSerializer):
+ORDER_ITEMS_PREFETCH = Prefetch(
+    "items",
+    queryset=OrderItem.objects.select_related("menu_item__category").prefetch_related(
+        "menu_item__tags"
+    ),
+)
+
+
+class SparseFieldsetMixin:
+    """Apply ``?fields=`` and ``?expand=`` from the request to reads.
+
+    ``fields`` keeps only the named top-level fields. Once ``expand`` is given,
+    the relations in ``expandable_fields`` are only nested when named (dotted
+    paths reach deeper, e.g. ``items.menu_item``) and are rendered as primary
+    keys otherwise. Without ``expand`` every relation stays nested.
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the serializer built by the view gets the request in its context.
+        request = self.context.get("request")
+        if request is None or request.method not in ("GET", "HEAD"):
+            return
+        params = request.query_params
+        if params.get("fields"):
+            keep = set(params["fields"].split(","))
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+        if "expand" in params:
+            self.apply_expand([path for path in params["expand"].split(",") if path])
+
+    def apply_expand(self, paths):
+        for name in self.expandable_fields:
+            if name not in self.fields:
+                continue
+            field = self.fields[name]
+            if name in {path.split(".")[0] for path in paths}:
+                nested = getattr(field, "child", field)
+                if isinstance(nested, SparseFieldsetMixin):
+                    prefix = f"{name}."
+                    nested.apply_expand(
+                        [path[len(prefix):] for path in paths if path.startswith(prefix)]
+                    )
+                continue
+            kwargs = {} if field.source == name else {"source": field.source}
+            self.fields[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True, many=isinstance(field, serializers.ListSerializer), **kwargs
+            )
+
+
+class TableSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = [
@@ -17,17 +74,22 @@ class TableSerializer(serializers.ModelSerializer):
         ]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name"]
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ("category",)
+
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source="category", write_only=True
     )
+    tags = serializers.SlugRelatedField(
+        many=True, slug_field="slug", queryset=Tag.objects.all(), required=False
+    )
 
     class Meta:
         model = MenuItem
@@ -38,16 +100,22 @@ class MenuItemSerializer(serializers.ModelSerializer):
             "price",
             "is_available",
             "image",
+            "diet",
+            "tags",
             "category",
             "category_id",
         ]
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ("menu_item",)
+
     menu_item = MenuItemSerializer(read_only=True)
-    menu_item_id = serializers.PrimaryKeyRelatedField(
-        queryset=MenuItem.objects.all(), source="menu_item", write_only=True
-    )
+    # Resolved in bulk by OrderSerializer.validate_items rather than with one
+    # PrimaryKeyRelatedField lookup per line.
+    menu_item_id = serializers.IntegerField(write_only=True)
+    # Writable so updates can address existing lines (see OrderSerializer.update).
+    id = serializers.IntegerField(required=False)
 
     class Meta:
         model = OrderItem
@@ -62,7 +130,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ["line_total"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ("table", "items")
+
     items = OrderItemSerializer(many=True)
     table = TableSerializer(read_only=True)
     table_id = serializers.PrimaryKeyRelatedField(
@@ -84,37 +154,152 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["total_price", "created_at", "updated_at"]
 
+    def validate_items(self, items_data):
+        """Swap every ``menu_item_id`` for its MenuItem using a single query."""
+        ids = {data["menu_item_id"] for data in items_data if "menu_item_id" in data}
+        menu_items = MenuItem.objects.select_related("category").in_bulk(ids)
+        existing_ids = set()
+        if self.instance is not None:
+            existing_ids = {order_item.pk for order_item in self.instance.items.all()}
+        seen_ids = set()
+        errors = []
+        for item_data in items_data:
+            line_errors = {}
+            pk = item_data.get("menu_item_id")
+            if pk is None:
+                if "id" not in item_data:
+                    line_errors["menu_item_id"] = ["This field is required."]
+            elif pk not in menu_items:
+                line_errors["menu_item_id"] = [f'Invalid pk "{pk}" - object does not exist.']
+            if "id" in item_data:
+                if self.instance is None:
+                    line_errors["id"] = ["Cannot reference an order item when creating an order."]
+                elif item_data["id"] not in existing_ids:
+                    line_errors["id"] = [
+                        f'Order item "{item_data["id"]}" does not belong to this order.'
+                    ]
+                elif item_data["id"] in seen_ids:
+                    line_errors["id"] = [f'Order item "{item_data["id"]}" is listed twice.']
+                seen_ids.add(item_data["id"])
+            errors.append(line_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item_data in items_data:
+            if "menu_item_id" in item_data:
+                item_data["menu_item"] = menu_items[item_data.pop("menu_item_id")]
+        return items_data
+
+    def _build_items(self, order, items_data):
+        """Price order lines in memory; OrderItem.save is bypassed by bulk_create."""
+        return [
+            OrderItem(
+                order=order,
+                line_total=item_data["menu_item"].price * item_data.get("quantity", 1),
+                **item_data,
+            )
+            for item_data in items_data
+        ]
+
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
-        order = Order.objects.create(**validated_data)
-        total = 0
-        for item_data in items_data:
-            order_item = OrderItem.objects.create(order=order, **item_data)
-            total += order_item.line_total
-        order.total_price = total
-        order.save(update_fields=["total_price"])
-        # Mark table as occupied and start session if not already
-        table = order.table
-        if table.status != table.STATUS_OCCUPIED:
-            from django.utils import timezone
-
-            table.status = table.STATUS_OCCUPIED
-            table.opened_at = timezone.now()
-            table.save(update_fields=["status", "opened_at"])
+        with transaction.atomic():
+            order = Order(**validated_data)
+            order_items = self._build_items(order, items_data)
+            order.total_price = sum((item.line_total for item in order_items), 0)
+            order.save()
+            OrderItem.objects.bulk_create(order_items)
+            # Mark table as occupied and start session if not already
+            table = order.table
+            if table.status != table.STATUS_OCCUPIED:
+                table.status = table.STATUS_OCCUPIED
+                # The order's own timestamp, so the session (core.billing)
+                # starts no later than its first order.
+                table.opened_at = order.created_at
+                table.save(update_fields=["status", "opened_at"])
+        # One query for the nested response instead of one per line.
+        prefetch_related_objects([order], ORDER_ITEMS_PREFETCH)
         return order
 
+    def _sync_items(self, order, items_data):
+        """Apply ``items_data`` as a diff against the order's current lines.
+
+        Incoming lines are matched to existing rows by ``id`` first and then by
+        ``(menu_item, custom_notes)``. Only changed rows are written, with one
+        bulk statement per kind of change, so existing OrderItem primary keys
+        survive. Returns the change in the order total.
+        """
+        existing = list(order.items.all())
+        unmatched = {order_item.pk: order_item for order_item in existing}
+        matches = []
+        pending = []
+        for item_data in items_data:
+            if "id" in item_data:
+                matches.append((unmatched.pop(item_data["id"]), item_data))
+            else:
+                pending.append(item_data)
+
+        new_lines = []
+        for item_data in pending:
+            key = (item_data["menu_item"].pk, item_data.get("custom_notes", ""))
+            order_item = next(
+                (
+                    candidate
+                    for candidate in unmatched.values()
+                    if (candidate.menu_item_id, candidate.custom_notes) == key
+                ),
+                None,
+            )
+            if order_item is None:
+                new_lines.append(item_data)
+            else:
+                del unmatched[order_item.pk]
+                matches.append((order_item, item_data))
+
+        delta = 0
+        changed = []
+        for order_item, item_data in matches:
+            menu_item = item_data.get("menu_item", order_item.menu_item)
+            quantity = item_data.get("quantity", order_item.quantity)
+            notes = item_data.get("custom_notes", order_item.custom_notes)
+            repriced = menu_item.pk != order_item.menu_item_id or quantity != order_item.quantity
+            if not repriced and notes == order_item.custom_notes:
+                continue
+            if repriced:
+                line_total = menu_item.price * quantity
+                delta += line_total - order_item.line_total
+                order_item.line_total = line_total
+            order_item.menu_item = menu_item
+            order_item.quantity = quantity
+            order_item.custom_notes = notes
+            changed.append(order_item)
+
+        created = self._build_items(order, new_lines)
+        delta += sum(order_item.line_total for order_item in created)
+        delta -= sum(order_item.line_total for order_item in unmatched.values())
+
+        if unmatched:
+            # update() saves the order right after, which moves updated_at.
+            with signals.skip_order_hooks():
+                OrderItem.objects.filter(pk__in=list(unmatched)).delete()
+        if changed:
+            OrderItem.objects.bulk_update(
+                changed, ["menu_item", "quantity", "custom_notes", "line_total"]
+            )
+        if created:
+            OrderItem.objects.bulk_create(created)
+        return delta
+
     def update(self, instance, validated_data):
         items_data = validated_data.pop("items", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            if items_data is not None:
+                instance.total_price += self._sync_items(instance, items_data)
+                events.note_change(instance, events.ITEMS)
+            instance.save()
 
         if items_data is not None:
-            instance.items.all().delete()
-            total = 0
-            for item_data in items_data:
-                order_item = OrderItem.objects.create(order=instance, **item_data)
-                total += order_item.line_total
-            instance.total_price = total
-            instance.save(update_fields=["total_price"])
+            getattr(instance, "_prefetched_objects_cache", {}).pop("items", None)
+            prefetch_related_objects([instance], ORDER_ITEMS_PREFETCH)
         return instance
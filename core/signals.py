@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import conditional, events, live_stats, menu_cache, rollups
+from .models import Category, MenuItem, Order, OrderItem, Table, Tag
+
+_hooks_skipped = ContextVar("order_hooks_skipped", default=False)
+
+
+@contextmanager
+def skip_order_hooks():
+    """Skip the order bookkeeping receivers below for writes in this block.
+
+    For callers that do that work themselves, e.g. ``OrderSerializer``,
+    which saves the order (moving ``updated_at``) after rewriting its lines,
+    or that must not have it done: ``archive`` deletes the orders it has
+    copied without taking them out of the rollups.
+    """
+    token = _hooks_skipped.set(True)
+    try:
+        yield
+    finally:
+        _hooks_skipped.reset(token)
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=MenuItem.tags.through)
+def invalidate_menu_cache(sender, **kwargs):
+    conditional.bump(conditional.MENU)
+    # Bump after commit so no reader can rebuild the new version from old rows.
+    transaction.on_commit(menu_cache.invalidate)
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def bump_table_counter(sender, **kwargs):
+    conditional.bump(conditional.TABLE)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def touch_order(sender, instance, **kwargs):
+    # Lines saved outside OrderSerializer (admin inlines, shell) still have to
+    # move the order's ETag / Last-Modified.
+    if _hooks_skipped.get():
+        return
+    Order.objects.filter(pk=instance.order_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Table)
+def count_table_status(sender, instance, created, **kwargs):
+    previous_status = None if created else getattr(instance, "_loaded_status", None)
+    if previous_status != instance.status:
+        live_stats.table_changed(previous_status, instance.status)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Table)
+def uncount_table(sender, instance, **kwargs):
+    live_stats.table_changed(getattr(instance, "_loaded_status", instance.status), None)
+
+
+@receiver(pre_save, sender=Order)
+def claim_status_transition(sender, instance, raw, update_fields, **kwargs):
+    """Move the stored status first, and only from the status it really has.
+
+    ``_loaded_status`` is what this instance read, which another save may
+    have changed since. The conditional UPDATE claims the transition, so two
+    stale instances cannot both count one order in the rollups. Queryset
+    ``update(status=...)`` bypasses this; see ``core.rollups``.
+    """
+    previous_status = getattr(instance, "_loaded_status", None)
+    if (
+        raw
+        or instance._state.adding
+        or previous_status in (None, instance.status)
+        or (update_fields is not None and "status" not in update_fields)
+    ):
+        return
+    stored = Order.objects.filter(pk=instance.pk)
+    while previous_status is not None and not stored.filter(status=previous_status).update(
+        status=instance.status
+    ):
+        previous_status = stored.values_list("status", flat=True).first()
+    instance._loaded_status = previous_status
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    loaded_status = None if created else getattr(instance, "_loaded_status", None)
+    rollups.record_transition(instance, loaded_status)
+    if created or loaded_status != instance.status:
+        live_stats.order_changed(loaded_status, instance.status)
+    publish_order_event(instance, created)
+    instance._event_changes = set()
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def discard_order_from_rollups(sender, instance, **kwargs):
+    if _hooks_skipped.get():
+        return
+    rollups.discard_order(instance)
+    live_stats.order_changed(getattr(instance, "_loaded_status", instance.status), None)
+
+
+def publish_order_event(instance, created):
+    changes = getattr(instance, "_event_changes", set())
+    previous_status = getattr(instance, "_loaded_status", None)
+    if created:
+        changes.add(events.CREATED)
+        previous_status = None
+    elif previous_status is not None and previous_status != instance.status:
+        changes.add(events.STATUS)
+    else:
+        previous_status = None
+    events.publish_order(instance, changes or {events.UPDATED}, previous_status)
@@ -1,23 +1,31 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Count, Sum
+from django.db.models import Prefetch, Sum
 from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
-from .models import Category, MenuItem, Order, Table
+from . import archive, conditional, live_stats, menu_cache
+from .db_router import replica_reads, uses_replica
+from .models import DailyRevenue, Order, OrderItem, Table
 
+# Order lines with the menu item each template line shows.
+ITEMS_WITH_MENU_ITEM = Prefetch("items", queryset=OrderItem.objects.select_related("menu_item"))
 
+
+@uses_replica
 def home(request: HttpRequest) -> HttpResponse:
-    featured_items = (
-        MenuItem.objects.filter(is_available=True)
-        .select_related("category")
-        .order_by("-id")[:3]
-    )
+    menu = menu_cache.get_menu()
+    featured_items = sorted(menu.available_items, key=lambda item: item.pk, reverse=True)[:3]
     stats = {
-        "category_count": Category.objects.count(),
-        "menu_item_count": MenuItem.objects.filter(is_available=True).count(),
-        "active_tables": Table.objects.exclude(status=Table.STATUS_AVAILABLE).count(),
-        "open_orders": Order.objects.exclude(status=Order.STATUS_CLOSED).count(),
+        "category_count": len(menu.categories),
+        "menu_item_count": len(menu.available_items),
+        "active_tables": sum(
+            count
+            for status, count in live_stats.table_counts().items()
+            if status != Table.STATUS_AVAILABLE
+        ),
+        "open_orders": live_stats.open_orders(),
     }
     context = {
         "featured_items": featured_items,
@@ -26,30 +34,24 @@ def home(request: HttpRequest) -> HttpResponse:
     return render(request, "core/home.html", context)
 
 
+@uses_replica
+@conditional.conditional_on(lambda request: menu_cache.get_menu().stamp)
 def menu_page(request: HttpRequest) -> HttpResponse:
-    items = (
-        MenuItem.objects.filter(is_available=True)
-        .exclude(name__icontains="chicken")
-        .exclude(name__icontains="mutton")
-        .exclude(name__icontains="egg")
-        .select_related("category")
-        .order_by("category__name", "name")
+    items = sorted(
+        menu_cache.get_menu().veg_items,
+        key=lambda item: (item.category.name, item.name),
     )
     return render(request, "core/menu.html", {"items": items})
 
 
+@uses_replica
 def order_page(request: HttpRequest) -> HttpResponse:
     table_id = request.GET.get("table")
     if not table_id:
         raise Http404("Table not specified")
     table = get_object_or_404(Table, id=table_id)
-    items = (
-        MenuItem.objects.filter(is_available=True)
-        .exclude(name__icontains="chicken")
-        .exclude(name__icontains="mutton")
-        .exclude(name__icontains="egg")
-        .order_by("name")
-    )
+    # Snapshot items are already ordered by name.
+    items = menu_cache.get_menu().veg_items
     return render(
         request,
         "core/order.html",
@@ -60,8 +62,19 @@ def order_page(request: HttpRequest) -> HttpResponse:
     )
 
 
+@uses_replica
+@conditional.conditional_on(lambda request, order_id: conditional.order_stamp(order_id))
 def order_status_page(request: HttpRequest, order_id: int) -> HttpResponse:
-    order = get_object_or_404(Order, id=order_id)
+    # Old closed orders may have been moved to the archive.
+    queryset = Order.objects.select_related("table").prefetch_related(ITEMS_WITH_MENU_ITEM)
+    order = archive.find_order(order_id, queryset)
+    if order is None:
+        # Guests land here right after ordering, possibly before the replica
+        # has the order.
+        with replica_reads(False):
+            order = archive.find_order(order_id, queryset)
+    if order is None:
+        raise Http404("No order matches the given query.")
     return render(request, "core/order_status.html", {"order": order})
 
 
@@ -74,42 +87,32 @@ def staff_required(view_func):
     return decorated
 
 
+@uses_replica
 @staff_required
 def admin_dashboard(request: HttpRequest) -> HttpResponse:
-    total_revenue = (
-        Order.objects.filter(status__in=[Order.STATUS_SERVED, Order.STATUS_CLOSED])
-        .aggregate(total=Sum("total_price"))
-        .get("total")
-        or 0
-    )
-    # Daily revenue (SQLite dev-friendly); swap to proper date filter for PostgreSQL
+    # Rollups hold one row per day (per item), maintained by core.rollups.
+    total_revenue = DailyRevenue.objects.aggregate(total=Sum("revenue")).get("total") or 0
     daily_revenue = (
-        Order.objects.filter(status__in=[Order.STATUS_SERVED, Order.STATUS_CLOSED])
-        .extra(where=["date(created_at) = date('now')"])
-        .aggregate(total=Sum("total_price"))
-        .get("total")
+        DailyRevenue.objects.filter(date=timezone.localdate())
+        .values_list("revenue", flat=True)
+        .first()
         or 0
     )
     active_orders = (
         Order.objects.exclude(status=Order.STATUS_CLOSED)
         .select_related("table")
+        .prefetch_related(ITEMS_WITH_MENU_ITEM)
         .order_by("-created_at")[:20]
     )
-    table_stats = (
-        Table.objects.values("status")
-        .annotate(count=Count("id"))
-        .order_by("status")
-    )
-    popular_dishes = (
-        MenuItem.objects.filter(
-            order_items__order__status__in=[
-                Order.STATUS_SERVED,
-                Order.STATUS_CLOSED,
-            ]
-        )
-        .annotate(times_ordered=Count("order_items"))
-        .order_by("-times_ordered")[:5]
-    )
+    table_stats = [
+        {"status": status, "count": count}
+        for status, count in sorted(live_stats.table_counts().items())
+        if count
+    ]
+    popular_dishes = [
+        {"id": item.pk, "name": item.name, "times_ordered": times_ordered}
+        for item, times_ordered in live_stats.top_dishes(5)
+    ]
     context = {
         "total_revenue": total_revenue,
         "daily_revenue": daily_revenue,
@@ -1,20 +1,251 @@
-import json
+import asyncio
+from collections import deque
+from datetime import datetime
+from urllib.parse import parse_qs
 
+import msgpack
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.db.models import F, Q
+
+from . import compact, events
+from .event_journal import get_journal
+from .models import ArchivedOrder, Order
+from .parsers import unpackb
+from .renderers import packb
+
+ORDER_STATUSES = {value for value, _label in Order.STATUS_CHOICES}
+
+MSGPACK_SUBPROTOCOL = "msgpack"
 
 
 class OrderStreamConsumer(AsyncJsonWebsocketConsumer):
+    """Stream order events to KDS screens.
+
+    By default a connection joins the ``orders`` group. ``?table=3,4`` and/or
+    ``?status=received,preparing`` narrow it to the matching per-table and
+    per-status groups instead (see ``core.events``).
+
+    Protocol (JSON frames):
+
+    * server ``{"type": "hello", "epoch", "seq"}`` right after connecting;
+    * server ``{"type": "event", "seq", ...}`` for every order event;
+    * client ``{"type": "resume", "epoch", "seq"}`` with the last event it
+      processed, answered by ``{"type": "replay", "epoch", "seq", "events"}``
+      holding only the missed events, or by a snapshot when the cursor is
+      from another epoch or older than the replay buffer;
+    * client ``{"type": "snapshot"}``, answered by ``{"type": "snapshot",
+      "epoch", "seq", "orders"}`` with every open order in compact form.
+
+    With a positive ``ORDER_STREAM["COALESCE_WINDOW"]`` (seconds), events are
+    held in a per-connection outbox keyed by order and sent together as one
+    ``{"type": "batch", "seq", "events"}`` frame; a newer event for an order
+    replaces the pending one. While a slow screen is still receiving the
+    previous frame the outbox keeps absorbing updates, and if it grows past
+    ``MAX_PENDING`` orders it is dropped in favour of a fresh snapshot.
+
+    Clients that offer the ``msgpack`` subprotocol get the same frames as
+    binary MessagePack messages and may send theirs that way too.
+    """
+
+    def parse_filters(self):
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        tables = {t for value in params.get("table", []) for t in value.split(",")}
+        statuses = {s for value in params.get("status", []) for s in value.split(",")}
+        self.tables = {int(table) for table in tables if table.isdigit()}
+        self.statuses = statuses & ORDER_STATUSES
+
+    def get_groups(self):
+        groups = [events.table_group(table) for table in sorted(self.tables)]
+        groups += [events.status_group(status) for status in sorted(self.statuses)]
+        return groups or [events.ORDERS_GROUP]
+
     async def connect(self):  # type: ignore[override]
-        await self.channel_layer.group_add("orders", self.channel_name)
-        await self.accept()
+        self.parse_filters()
+        # Channels discards everything in self.groups on disconnect.
+        self.groups = self.get_groups()
+        for group in self.groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        # An event reaches every group it matches; drop the repeats.
+        self.recent_event_ids = deque(maxlen=64)
+        self.journal = get_journal()
+        self.journal.ensure_following(self.channel_layer)
+        config = getattr(settings, "ORDER_STREAM", {})
+        self.coalesce_window = config.get("COALESCE_WINDOW", 0)
+        self.max_pending = config.get("MAX_PENDING", 200)
+        self.outbox = {}
+        self.overflowed = False
+        self.flusher = None
+        self.binary = MSGPACK_SUBPROTOCOL in self.scope.get("subprotocols", [])
+        await self.accept(MSGPACK_SUBPROTOCOL if self.binary else None)
+        await self.send_json(
+            {"type": "hello", "epoch": self.journal.epoch, "seq": self.journal.seq}
+        )
 
     async def disconnect(self, code):  # type: ignore[override]
-        await self.channel_layer.group_discard("orders", self.channel_name)
+        if getattr(self, "flusher", None) is not None:
+            self.flusher.cancel()
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is not None and self.binary:
+            try:
+                content = unpackb(bytes_data)
+            except (ValueError, msgpack.UnpackException):
+                await self.send_json({"type": "error", "detail": "Malformed message."})
+                return
+            await self.receive_json(content)
+            return
+        await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
+    async def send_json(self, content, close=False):
+        if self.binary:
+            await self.send(bytes_data=packb(content), close=close)
+        else:
+            await super().send_json(content, close=close)
 
     async def receive_json(self, content, **kwargs):  # type: ignore[override]
-        # For now, just echo payload; later this will be used by staff/KDS
-        await self.send_json({"type": "echo", "payload": content})
+        message_type = content.get("type") if isinstance(content, dict) else None
+        if message_type == "resume":
+            await self.resume(content.get("epoch"), content.get("seq"))
+        elif message_type == "snapshot":
+            await self.send_snapshot()
+        else:
+            await self.send_json({"type": "error", "detail": "Unknown message type."})
+
+    def wants(self, data):
+        return not set(self.groups).isdisjoint(events.groups_for(data))
+
+    async def resume(self, epoch, seq):
+        missed = self.journal.since(epoch, seq) if isinstance(seq, int) else None
+        if missed is None:
+            await self.send_snapshot()
+            return
+        await self.send_json(
+            {
+                "type": "replay",
+                "epoch": self.journal.epoch,
+                "seq": self.journal.seq,
+                "events": [
+                    {"type": "event", "seq": event_seq, **data}
+                    for event_seq, data in missed
+                    if self.wants(data)
+                ],
+            }
+        )
+
+    async def send_snapshot(self):
+        # Taken before the query: anything newer arrives as a regular event.
+        epoch, seq = self.journal.epoch, self.journal.seq
+        orders = await self.open_orders()
+        await self.send_json({"type": "snapshot", "epoch": epoch, "seq": seq, "orders": orders})
+
+    @database_sync_to_async
+    def open_orders(self):
+        queryset = Order.objects.exclude(status=Order.STATUS_CLOSED)
+        if self.tables or self.statuses:
+            # Same union the group subscriptions give.
+            queryset = queryset.filter(
+                Q(table_id__in=self.tables) | Q(status__in=self.statuses)
+            )
+        return compact.compact_orders(compact.order_rows(queryset).order_by("created_at", "id"))
 
     async def order_updated(self, event):
-        # Called when an order update is sent to the "orders" group
-        await self.send_json(event["data"])
+        # Called when an order update is sent to one of this connection's groups
+        data = event["data"]
+        if data.get("event_id") in self.recent_event_ids:
+            return
+        self.recent_event_ids.append(data.get("event_id"))
+        frame = {"type": "event", "seq": self.journal.record(data), **data}
+        if self.coalesce_window <= 0:
+            await self.send_json(frame)
+            return
+        order_id = data["order"]["id"]
+        pending = self.outbox.get(order_id)
+        self.outbox[order_id] = frame if pending is None else events.merge(pending, frame)
+        if len(self.outbox) > self.max_pending:
+            self.outbox.clear()
+            self.overflowed = True
+        if self.flusher is None or self.flusher.done():
+            self.flusher = asyncio.ensure_future(self.flush_outbox())
+
+    async def flush_outbox(self):
+        await asyncio.sleep(self.coalesce_window)
+        # Updates that arrive while a frame is being sent are merged into the
+        # outbox and go out in the next pass of this loop.
+        while self.outbox or self.overflowed:
+            if self.overflowed:
+                self.overflowed = False
+                await self.send_snapshot()
+                continue
+            frames, self.outbox = list(self.outbox.values()), {}
+            await self.send_json(
+                {"type": "batch", "seq": max(f["seq"] for f in frames), "events": frames}
+            )
+
+
+class OrderTrackingConsumer(AsyncJsonWebsocketConsumer):
+    """Push one order's progress to the guest's tracking page.
+
+    ``ws/orders/<order_id>/`` joins only ``orders.order.<order_id>``. The
+    server sends ``{"type": "order", "order": {...}}`` with the current state
+    right after connecting, then the same frame with ``changes`` (and
+    ``previous_status``) for every event. Once the order is closed the
+    server closes the socket. Unknown orders are closed with code 4404.
+    """
+
+    async def connect(self):  # type: ignore[override]
+        self.order_id = self.scope["url_route"]["kwargs"]["order_id"]
+        # Join before reading the state so no event falls in between; events
+        # are only handled once connect() returns.
+        self.groups = [events.order_group(self.order_id)]
+        await self.channel_layer.group_add(self.groups[0], self.channel_name)
+        state = await self.load_state()
+        await self.accept()
+        if state is None:
+            # Accepted first so the page sees the code and stops retrying.
+            await self.close(code=4404)
+            return
+        self.updated_at = None
+        await self.send_order({"order": state, "changes": []})
+
+    @database_sync_to_async
+    def load_state(self):
+        order = Order.objects.select_related("table").filter(pk=self.order_id).first()
+        if order is not None:
+            return events.order_payload(order, [])["order"]
+        archived = (
+            ArchivedOrder.objects.filter(pk=self.order_id)
+            .values(
+                "id", "table_id", "total_price", "closed_at", table_number=F("table__table_number")
+            )
+            .first()
+        )
+        if archived is None:
+            return None
+        return {
+            "id": archived["id"],
+            "table_id": archived["table_id"],
+            "table": archived["table_number"],
+            "status": Order.STATUS_CLOSED,
+            "total_price": str(archived["total_price"]),
+            "updated_at": compact._iso(archived["closed_at"]),
+        }
+
+    async def order_updated(self, event):
+        await self.send_order(event["data"])
+
+    async def send_order(self, data):
+        order = data["order"]
+        # Events queued while the state was read may be older than it.
+        updated_at = datetime.fromisoformat(order["updated_at"])
+        if self.updated_at is not None and updated_at < self.updated_at:
+            return
+        self.updated_at = updated_at
+        frame = {"type": "order", "order": order, "changes": data["changes"]}
+        if data.get("previous_status"):
+            frame["previous_status"] = data["previous_status"]
+        await self.send_json(frame, close=order["status"] == Order.STATUS_CLOSED)
+
+    async def receive_json(self, content, **kwargs):  # type: ignore[override]
+        await self.send_json({"type": "error", "detail": "This stream is read-only."})
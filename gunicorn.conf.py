@@ -0,0 +1,54 @@
+"""Gunicorn settings; picked up automatically from the project directory.
+
+    gunicorn backend.asgi:application            (Procfile, HTTP + WebSockets)
+    gunicorn -k gthread backend.wsgi:application (HTTP only)
+
+Each setting can be overridden from the environment (or the command line).
+
+An ASGI worker is one event loop. Django runs the sync views and middleware
+of each request on a thread of its own (``ThreadSensitiveContext``), so a
+single worker already overlaps requests waiting on the database; its Python
+code is bound to one core by the GIL, though, so the default is one worker
+per CPU. ``threads`` applies to the WSGI ``gthread`` workers only; under
+ASGI nothing caps the requests in flight per worker.
+
+Each request in flight holds a database connection of its own, and under
+ASGI that connection is closed when the request ends (``CONN_MAX_AGE`` 0,
+see ``backend/asgi.py``). On PostgreSQL, run PgBouncer in session mode
+and point ``DATABASE_URL`` at it: it reuses and caps the server connections,
+which otherwise need a ``max_connections`` sized for the peak number of
+requests in flight.
+
+A deploy sends SIGTERM: workers stop accepting, finish in-flight requests,
+close WebSockets with 1012 so KDS screens reconnect (and resume, see
+``core.ws_consumers``) on the new workers, and are killed after
+``graceful_timeout`` seconds.
+"""
+
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", cpus))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "backend.workers.ASGIWorker")
+threads = int(os.environ.get("GUNICORN_THREADS", 2 * cpus))
+
+# Seconds an idle keep-alive connection stays open. Behind a load balancer,
+# make it longer than the balancer's idle timeout so the balancer never
+# reuses a connection the worker is closing.
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Worker heartbeat; a worker silent for this long is restarted.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Restarting a worker after N requests would also drop its WebSockets, so
+# this is off unless set.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Trust X-Forwarded-* only from these addresses (the load balancer).
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None